@@ -0,0 +1,87 @@
+"""
+@author: Joseph A.
+Description: Micro-benchmark of the response serialization of the movies list and stats endpoints,
+comparing FastAPI's default path (jsonable_encoder + json) with FastJSONResponse (orjson).
+Run from the api directory: python -m benchmarks.serialization
+"""
+import json
+import timeit
+from datetime import date
+from databases.backends.common.records import Record
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from utils.json_response import FastJSONResponse
+
+ROWS = 1000 # Size of a full movies page
+REPEAT = 50
+
+
+def make_movies(count: int):
+    """Build database records shaped like the movies table.
+
+    Args:
+        count (int): Number of records
+
+    Returns:
+        list: databases Records with a dict as row, as returned for raw SQL queries
+    """
+    rows = [{
+        "id": i,
+        "title": f"Movie {i}",
+        "release_date": date(2000 + i % 25, 1 + i % 12, 1 + i % 28),
+        "rating": round(5 + (i % 50) / 10, 1),
+        "genre": "Action, Drame, Comédie",
+        "tmdb_id": 100000 + i,
+        "original_language": "fr",
+        "poster_path": f"/poster_{i}.jpg",
+    } for i in range(count)]
+    return [Record(row, (), None, ({}, {}, {})) for row in rows]
+
+
+def make_stat():
+    """Build a stats row payload as stored in the JSONB column.
+
+    Returns:
+        str: The serialized statistic
+    """
+    return json.dumps({
+        "data": {f"Country {i}": {"mean": 6.5, "count": i} for i in range(200)},
+        "total_ratings": 20000,
+        "average_rating": 6.5,
+    })
+
+
+def measure(label: str, function):
+    """Time a serialization path.
+
+    Args:
+        label (str): Name of the path
+        function (Callable): Serialization to time
+
+    Returns:
+        float: Milliseconds per call
+    """
+    elapsed = min(timeit.repeat(function, number=REPEAT, repeat=5)) / REPEAT * 1000
+    print(f"  {label:<40} {elapsed:8.3f} ms")
+    return elapsed
+
+
+def main():
+    """Run the benchmark and print the CPU time saved per request.
+    """
+    movies = make_movies(ROWS)
+    print(f"Movies list ({ROWS} records)")
+    before = measure("jsonable_encoder + JSONResponse", lambda: JSONResponse(jsonable_encoder(movies)))
+    after = measure("FastJSONResponse", lambda: FastJSONResponse(movies))
+    print(f"  saved per request: {before - after:.3f} ms ({before / after:.1f}x)")
+
+    stat = make_stat()
+    print("Statistic (200 countries)")
+    before = measure("json.loads + jsonable_encoder + JSON",
+                    lambda: JSONResponse(jsonable_encoder(json.loads(stat))))
+    after = measure("cached body", lambda: Response(stat.encode("utf-8"), media_type="application/json"))
+    print(f"  saved per request: {before - after:.3f} ms ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
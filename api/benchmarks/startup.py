@@ -0,0 +1,78 @@
+"""
+@author: Joseph A.
+Description: Cold start benchmark of the API. Imports main in fresh interpreters with
+-X importtime, reports the slowest modules and fails when the import time exceeds the budget.
+Run from the api directory: python -m benchmarks.startup [--budget 500] [--top 15]
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+# Import time budget of main, in milliseconds
+COLD_START_BUDGET_MS = float(os.getenv('COLD_START_BUDGET_MS', '500'))
+
+# Packages of the API, always reported
+API_PACKAGES = ("main", "config", "routers", "services", "utils")
+
+
+def measure_imports(module: str = "main"):
+    """Import a module in a fresh interpreter and collect its import times.
+
+    Args:
+        module (str, optional): Module to import. Defaults to 'main'.
+
+    Raises:
+        RuntimeError: If the import fails
+
+    Returns:
+        dict: (self, cumulative) import time in milliseconds by module name
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}:\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        timings[name.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return timings
+
+
+def main():
+    """Run the benchmark and exit with an error code when the budget is exceeded.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget", type=float, default=COLD_START_BUDGET_MS,
+                        help="Import time budget of main, in milliseconds")
+    parser.add_argument("--top", type=int, default=15, help="Number of modules reported")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Number of runs, the fastest one is reported")
+    args = parser.parse_args()
+
+    runs = [measure_imports() for _ in range(args.repeat)]
+    timings = min(runs, key=lambda run: run["main"][1])
+    total = timings["main"][1]
+
+    print(f"Slowest imports (cumulative, fastest of {args.repeat} runs)")
+    slowest = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (self_ms, cumulative_ms) in slowest:
+        print(f"  {name:<50} {cumulative_ms:8.1f} ms  (self {self_ms:.1f} ms)")
+
+    print("API modules")
+    for name, (self_ms, cumulative_ms) in sorted(timings.items()):
+        if name.split(".")[0] in API_PACKAGES:
+            print(f"  {name:<50} {cumulative_ms:8.1f} ms  (self {self_ms:.1f} ms)")
+
+    print(f"Import of main: {total:.1f} ms (budget {args.budget:.0f} ms)")
+    if total > args.budget:
+        print("❌ Cold start budget exceeded")
+        sys.exit(1)
+    print("✅ Within the cold start budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,12 @@
 Description: This script contains the configuration of the API.
 """
 import os
+import time
+import asyncio
 from dotenv import load_dotenv
-from databases import Database
-from sqlalchemy import create_engine, MetaData
+from config.settings import (DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_WARMUP,
+                            DB_POOL_MAX_IDLE, DB_HEALTH_TIMEOUT, DB_PREPARED_STATEMENTS,
+                            DB_STATEMENT_CACHE_SIZE)
 
 # Configuration
 load_dotenv()
@@ -13,20 +16,87 @@ load_dotenv()
 # PostgreSQL - Use DATABASE_URL (Neon) if available, fallback to POSTGRES_URL
 POSTGRES_URL = os.getenv('DATABASE_URL') or os.getenv('POSTGRES_URL')
 
-# Disable prepared statement cache for connection pooler compatibility
-database = Database(
-    POSTGRES_URL,
-    min_size=1,
-    max_size=5,
-    statement_cache_size=0
-)
-engine = create_engine(POSTGRES_URL)
-metadata = MetaData()
+# Single pool of the API, created on first connection
+database = None
+
+connect_lock = asyncio.Lock()
+
+
+def create_database():
+    """Build the pool of the API. databases (and SQLAlchemy behind it) is imported here
+    rather than at module level, so importing the app stays fast on cold starts.
+
+    Returns:
+        Database: The pool, not connected yet. The prepared statement cache is disabled
+            by default for connection pooler compatibility.
+    """
+    from databases import Database # pylint: disable=C0415:import-outside-toplevel
+    return Database(
+        POSTGRES_URL,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        max_inactive_connection_lifetime=DB_POOL_MAX_IDLE,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE if DB_PREPARED_STATEMENTS else 0
+    )
+
+
+async def warmup_pool(connections: int = DB_POOL_WARMUP):
+    """Open connections ahead of the first requests, each one running a trivial query.
+
+    Args:
+        connections (int, optional): Number of connections to open. Defaults to DB_POOL_WARMUP.
+    """
+    # Each task holds its own connection, so they are opened concurrently
+    await asyncio.gather(*(database.fetch_val("SELECT 1")
+                        for _ in range(min(connections, DB_POOL_MAX_SIZE))))
+
+
+async def connect_database():
+    """Create, open and warm up the pool, unless it is already open.
+    """
+    global database # pylint: disable=W0603:global-statement
+    async with connect_lock:
+        if database is None:
+            database = create_database()
+        if database.is_connected:
+            return
+        await database.connect()
+        await warmup_pool()
+
+
+async def disconnect_database():
+    """Close the pool.
+    """
+    async with connect_lock:
+        if database is not None and database.is_connected:
+            await database.disconnect()
 
 
 async def get_database():
     """Ensure database is connected (needed for serverless environments
     where startup events may not fire)."""
-    if not database.is_connected:
-        await database.connect()
+    if database is None or not database.is_connected:
+        await connect_database()
     return database
+
+
+async def check_health():
+    """Check that the database answers within DB_HEALTH_TIMEOUT.
+
+    Raises:
+        Exception: If the database cannot be reached
+
+    Returns:
+        dict: Query latency and pool usage
+    """
+    db = await get_database()
+    start = time.perf_counter()
+    await asyncio.wait_for(db.fetch_val("SELECT 1"), timeout=DB_HEALTH_TIMEOUT)
+    pool = db._backend._pool # pylint: disable=W0212:protected-access
+    return {
+        "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        "pool_size": pool.get_size(),
+        "pool_idle": pool.get_idle_size(),
+        "pool_max_size": pool.get_max_size(),
+        "prepared_statements": DB_PREPARED_STATEMENTS,
+    }
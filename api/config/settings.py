@@ -0,0 +1,47 @@
+"""
+@author: Joseph A.
+Description: This script contains the tuning settings of the API.
+"""
+import os
+from dotenv import load_dotenv
+
+# Configuration
+load_dotenv()
+
+# Statistics cache - entries are checked against stats.created_at once expired
+STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', '300')) # Seconds
+# Source of the statistics - 'stats' (pandas engine) or 'stats_views' (in-database engine)
+STATS_TABLE = os.getenv('STATS_TABLE', 'stats')
+
+# HTTP caching - max-age sent to browsers and CDNs, ETags revalidate afterwards
+STATS_MAX_AGE = int(os.getenv('STATS_MAX_AGE', '300')) # Seconds
+CATALOGUE_MAX_AGE = int(os.getenv('CATALOGUE_MAX_AGE', '60')) # Seconds
+
+# Catalogue versions (bumped by the ETL loader) are looked up at most once per TTL
+CATALOGUE_VERSION_TTL = float(os.getenv('CATALOGUE_VERSION_TTL', '30')) # Seconds
+
+# Response compression - smaller bodies are sent as they are
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024')) # Bytes
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '5'))
+# Cached bodies are compressed once, a slower but denser setting pays off
+PRECOMPRESSED_GZIP_LEVEL = int(os.getenv('PRECOMPRESSED_GZIP_LEVEL', '9'))
+PRECOMPRESSED_BROTLI_QUALITY = int(os.getenv('PRECOMPRESSED_BROTLI_QUALITY', '11'))
+
+# Per tmdb_id lookup cache of /movies/{id} and /series/{id}
+LOOKUP_CACHE_SIZE = int(os.getenv('LOOKUP_CACHE_SIZE', '10000')) # Entries per table
+LOOKUP_CACHE_TTL = float(os.getenv('LOOKUP_CACHE_TTL', '600')) # Seconds
+LOOKUP_NEGATIVE_TTL = float(os.getenv('LOOKUP_NEGATIVE_TTL', '60')) # Seconds, unknown ids
+
+# Rating history and catalogue churn - window served when the request gives no start
+HISTORY_DEFAULT_DAYS = int(os.getenv('HISTORY_DEFAULT_DAYS', '30')) # Days
+
+# Database pool - a single asyncpg pool shared by every request
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '5'))
+DB_POOL_WARMUP = int(os.getenv('DB_POOL_WARMUP', '1')) # Connections opened at startup
+DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', '300')) # Seconds before closing idle ones
+DB_HEALTH_TIMEOUT = float(os.getenv('DB_HEALTH_TIMEOUT', '2')) # Seconds
+# Prepared statements break behind transaction poolers (Neon, PgBouncer), opt-in only
+DB_PREPARED_STATEMENTS = os.getenv('DB_PREPARED_STATEMENTS', 'false').lower() == 'true'
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '100'))
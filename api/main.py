@@ -2,19 +2,41 @@
 @author: Joseph A.
 Description:  Main FastAPI application for the Streamlytics API, handling movies and TV series data.
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from config.db import database
-from routers import movies, series, statistics
+from config.db import connect_database, disconnect_database, check_health
+from utils.compression import CompressionMiddleware
+from utils.json_response import FastJSONResponse
+from routers import movies, series, statistics, catalogue
+from services.catalogue_service import lookup_caches
 
 #pylint: disable = W0718:broad-exception-caught
 #pylint: disable = E0401:import-error
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Open and warm up the database pool when the application starts, and close it
+    when the application shuts down
+    """
+    try:
+        await connect_database()
+        print("Database connected successfully")
+    except Exception as e:
+        print(f"Warning: Failed to connect to database: {e}")
+        print("API will run without database - only statistics endpoints will work")
+    yield
+    try:
+        await disconnect_database()
+    except Exception as e:
+        print(f"Error during database disconnect: {e}")
+
 app = FastAPI(
     title="Streamlytics API",
     description="API for accessing movies and TV series data from netflix",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -27,33 +49,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-@app.on_event('startup')
-async def startup():
-    """Connect to the database when the application starts
-    """
-    try:
-        await database.connect()
-        print("Database connected successfully")
-    except Exception as e:
-        print(f"Warning: Failed to connect to database: {e}")
-        print("API will run without database - only statistics endpoints will work")
-
-@app.on_event('shutdown')
-async def shutdown():
-    """Disconnect from the database when the application shuts down
-    """
-    try:
-        if database.is_connected:
-            await database.disconnect()
-    except Exception as e:
-        print(f"Error during database disconnect: {e}")
+# Negotiated gzip/brotli compression of the responses that are not precompressed
+app.add_middleware(CompressionMiddleware)
 
 # Include routers
 app.include_router(movies.router, prefix="/api", tags=["Movies"])
 app.include_router(series.router, prefix="/api", tags=["Series"])
 app.include_router(statistics.router, prefix="/api/stats", tags=["Statistics"])
+app.include_router(catalogue.router, prefix="/api", tags=["Catalogue"])
 
 # API Root
 @app.get('/')
@@ -63,11 +69,36 @@ def read_root():
     Returns:
         dict: A dictionary containing the welcome message
     """
-    return JSONResponse(
+    return FastJSONResponse(
         content={"message": "Welcome to the Streamlytics API 🎬"},
         media_type="application/json; charset=utf-8"
     )
 
+# Health check
+@app.get('/health')
+async def health():
+    """Check that the API can reach the database
+
+    Returns:
+        dict: Database latency and pool usage, with a 503 status if the database is down
+    """
+    try:
+        database = await check_health()
+    except Exception as e:
+        return FastJSONResponse(status_code=503,
+                                content={"status": "unavailable", "detail": str(e)})
+    return {"status": "ok", "database": database}
+
+# Lookup cache counters
+@app.get('/api/cache')
+def get_cache_stats():
+    """Get the hit/miss counters of the per tmdb_id lookup caches
+
+    Returns:
+        dict: Counters of each lookup cache, by table
+    """
+    return {table: cache.get_stats() for table, cache in lookup_caches.items()}
+
 
 if __name__ == "__main__":
     import uvicorn
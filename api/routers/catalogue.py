@@ -0,0 +1,53 @@
+"""
+@author: Joseph A.
+Description: FastAPI router for handling catalogue history endpoints.
+"""
+from typing import Optional
+from datetime import date
+from fastapi import APIRouter, HTTPException, Query, Request
+#pylint: disable = E0401:import-error
+from config.db import get_database
+from config.settings import CATALOGUE_MAX_AGE
+from utils.http_cache import cache_headers, etag_matches, not_modified
+from utils.json_response import FastJSONResponse
+from services.catalogue_service import catalogue_versions
+from services.history_service import (resolve_window, build_churn_query, summarize_churn,
+                                    get_history_etag, MEDIA_TYPES)
+
+router = APIRouter()
+
+# Get the titles added to and removed from the catalogue per day
+@router.get('/catalogue/churn')
+async def get_catalogue_churn(request: Request, start: Optional[date] = None,
+                            end: Optional[date] = None,
+                            media_type: Optional[str] = Query(default=None,
+                                                            pattern='^(movies|series)$')):
+    """Get the number of titles added to and removed from the catalogue per day
+
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+        start (date, optional): First day, included. Defaults to HISTORY_DEFAULT_DAYS before end.
+        end (date, optional): Last day, included. Defaults to today.
+        media_type (str, optional): 'movies' or 'series', both by default
+
+    Raises:
+        HTTPException: If start is after end
+
+    Returns:
+        dict: The window, the days with titles added or removed, and the totals
+    """
+    try:
+        start, end = resolve_window(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    db = await get_database()
+    media_types = (media_type,) if media_type else MEDIA_TYPES
+    etag = await get_history_etag(catalogue_versions, db, media_types, start, end)
+    headers = cache_headers(etag, CATALOGUE_MAX_AGE) if etag else None
+    if etag and etag_matches(request, etag):
+        return not_modified(headers)
+
+    query, values = build_churn_query(start, end, media_type)
+    rows = await db.fetch_all(query=query, values=values)
+    return FastJSONResponse(summarize_churn(rows, start, end), headers=headers)
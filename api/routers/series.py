@@ -2,38 +2,158 @@
 @author: Joseph A.
 Description: FastAPI router for handling series-related endpoints.
 """
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from datetime import date
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 #pylint: disable = E0401:import-error
 from config.db import get_database
+from config.settings import CATALOGUE_MAX_AGE
+from utils.compression import precompressed_response
+from utils.http_cache import cache_headers, etag_matches, not_modified
+from utils.json_response import FastJSONResponse
+from services.catalogue_service import (build_list_query, next_cursor, iter_export,
+                                        catalogue_versions, lookup_caches, DEFAULT_PAGE_SIZE,
+                                        MAX_PAGE_SIZE, EXPORT_MEDIA_TYPES)
+from services.history_service import resolve_window, build_ratings_query, get_history_etag
 
 router = APIRouter()
 
 # Get all series
 @router.get('/series')
-async def get_series():
-    """Get all series from the database
+async def get_series(request: Request, fields: Optional[str] = None, after: Optional[int] = None,
+                    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                    genre: Optional[str] = None, language: Optional[str] = None,
+                    year_min: Optional[int] = None, year_max: Optional[int] = None,
+                    sort: str = Query(default='tmdb_id', pattern='^(tmdb_id|recent)$')):
+    """Get a page of series from the database, ordered by tmdb_id or most recent first
+
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+        fields (str, optional): Comma-separated columns to return (e.g. title,rating,poster_path)
+        after (int, optional): Cursor returned in the X-Next-Cursor header of the previous page
+        limit (int, optional): Maximum number of series returned. Defaults to 100.
+        genre (str, optional): Only series of this genre
+        language (str, optional): Only series in this original language
+        year_min (int, optional): Only series released this year or later
+        year_max (int, optional): Only series released this year or earlier
+        sort (str, optional): 'tmdb_id', or 'recent' for the most recently released first.
+            Only the tmdb_id order is paged with a cursor. Defaults to 'tmdb_id'.
+
+    Raises:
+        HTTPException: If a requested field is unknown, or after is given with sort=recent
 
     Returns:
-        list: A list of dictionaries containing series information.
+        list: A list of dictionaries containing series information. The X-Next-Cursor
+            header holds the cursor of the next page, it is absent on the last page.
     """
+    try:
+        query, values = build_list_query('series', fields, after, limit, genre, language,
+                                        year_min, year_max, sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
     db = await get_database()
-    query = 'SELECT * FROM series;'
-    return await db.fetch_all(query)
+    etag = await catalogue_versions.get_etag(db, 'series')
+    headers = cache_headers(etag, CATALOGUE_MAX_AGE) if etag else {}
+    if etag and etag_matches(request, etag):
+        return not_modified(headers)
+
+    rows = await db.fetch_all(query=query, values=values)
+    cursor = next_cursor(rows, limit) if sort == 'tmdb_id' else None
+    if cursor is not None:
+        headers['X-Next-Cursor'] = cursor
+    return FastJSONResponse(rows, headers=headers)
+
+# Export all series, declared before the tmdb_id route
+@router.get('/series/export')
+async def export_series(export_format: str = Query(default='ndjson', alias='format',
+                                                pattern='^(ndjson|json)$'),
+                    fields: Optional[str] = None, genre: Optional[str] = None,
+                    language: Optional[str] = None, year_min: Optional[int] = None,
+                    year_max: Optional[int] = None):
+    """Stream every series matching the filters, ordered by tmdb_id
+
+    Args:
+        export_format (str, optional): 'ndjson' (one object per line) or 'json' (array).
+            Defaults to 'ndjson'.
+        fields (str, optional): Comma-separated columns to return (e.g. title,rating,poster_path)
+        genre (str, optional): Only series of this genre
+        language (str, optional): Only series in this original language
+        year_min (int, optional): Only series released this year or later
+        year_max (int, optional): Only series released this year or earlier
+
+    Raises:
+        HTTPException: If a requested field is unknown
+
+    Returns:
+        StreamingResponse: The series, read through a server-side cursor
+    """
+    try:
+        query, values = build_list_query('series', fields, None, None, genre, language,
+                                        year_min, year_max)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    db = await get_database()
+    return StreamingResponse(iter_export(db, query, values, export_format),
+                            media_type=EXPORT_MEDIA_TYPES[export_format])
 
 # Get a serie by tmdb_id
 @router.get('/series/{tmdb_id}')
-async def get_serie(tmdb_id: int):
+async def get_serie(request: Request, tmdb_id: int):
     """Get a specific series by its tmdb_id
 
     Args:
+        request (Request): Incoming request, checked for If-None-Match
         tmdb_id (int): The tmdb_id of the serie to retrieve
 
     Returns:
         dict: Series information.
     """
     db = await get_database()
-    query = 'SELECT * FROM series WHERE tmdb_id = :tmdb_id;'
-    serie = await db.fetch_one(query=query, values={'tmdb_id': tmdb_id})
-    if not serie:
+    etag = await catalogue_versions.get_etag(db, 'series')
+    headers = cache_headers(etag, CATALOGUE_MAX_AGE) if etag else None
+    if etag and etag_matches(request, etag):
+        return not_modified(headers)
+
+    # Serialized once per tmdb_id, unknown ids are cached as well
+    entry = await lookup_caches['series'].get(db, tmdb_id)
+    if entry.body is None:
         raise HTTPException(status_code=404, detail='Serie not found.')
-    return serie
+    return precompressed_response(request, entry.body, entry.encoded, headers)
+
+# Get the rating trajectory of a serie
+@router.get('/series/{tmdb_id}/ratings')
+async def get_serie_ratings(request: Request, tmdb_id: int, start: Optional[date] = None,
+                           end: Optional[date] = None):
+    """Get the ratings of a serie over a window, from the rating history
+
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+        tmdb_id (int): The tmdb_id of the serie
+        start (date, optional): First day, included. Defaults to HISTORY_DEFAULT_DAYS before end.
+        end (date, optional): Last day, included. Defaults to today.
+
+    Raises:
+        HTTPException: If start is after end
+
+    Returns:
+        dict: The window and the ratings, one per change. The first one may predate the
+            window, it is the rating at its start.
+    """
+    try:
+        start, end = resolve_window(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    db = await get_database()
+    etag = await get_history_etag(catalogue_versions, db, ('series',), start, end)
+    headers = cache_headers(etag, CATALOGUE_MAX_AGE) if etag else None
+    if etag and etag_matches(request, etag):
+        return not_modified(headers)
+
+    query, values = build_ratings_query('series', tmdb_id, start, end)
+    rows = await db.fetch_all(query=query, values=values)
+    return FastJSONResponse({"tmdb_id": tmdb_id, "start": start, "end": end, "ratings": rows},
+                            headers=headers)
@@ -2,18 +2,55 @@
 @author: Joseph A.
 Description: Router for handling statistical data related to movies and TV series
 """
-from fastapi import APIRouter, HTTPException
-from services.statistics_service import StatisticsService
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from config.settings import STATS_MAX_AGE
+from services.statistics_service import StatisticsService, STAT_TYPES, MEDIA_TYPES
+from utils.compression import precompressed_response
+from utils.http_cache import cache_headers, etag_matches, not_modified
 
 #pylint: disable = E0401:import-error
 
 router = APIRouter()
 stats_service = StatisticsService()
 
+async def get_stat_response(request: Request, filename: str):
+    """Serve a statistic from the in-memory cache as already serialized JSON, or an empty
+    304 response when the client already holds the current version.
+
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+        filename (str): Legacy filename pattern of the statistic
+
+    Raises:
+        HTTPException: If there is an error accessing or parsing the data
+
+    Returns:
+        Response: The JSON body of the statistic, with its ETag and Cache-Control headers
+    """
+    try:
+        key = stats_service.get_stat_key(filename)
+        # Revalidations only need stats.created_at, the payload is not read
+        if request.headers.get("if-none-match"):
+            etag = stats_service.get_etag([key], await stats_service.get_versions([key]))
+            if etag_matches(request, etag):
+                return not_modified(cache_headers(etag, STATS_MAX_AGE))
+        entry = await stats_service.get_entry(filename)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+    # Compressed once per entry, the bytes are kept next to the cached body
+    etag = stats_service.get_etag([key], {key: entry.created_at})
+    return precompressed_response(request, entry.body, entry.encoded,
+                                cache_headers(etag, STATS_MAX_AGE))
+
 @router.get("/distribution/movies/countries")
-async def get_movies_countries_distribution():
+async def get_movies_countries_distribution(request: Request):
     """Get the distribution of movies by country.
 
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+
     Raises:
         HTTPException: If there is an error accessing or parsing the data file
 
@@ -23,15 +60,15 @@ async def get_movies_countries_distribution():
             - total: Total number of movies
             - count: Number of unique countries
     """
-    try:
-        return await stats_service.get_json_data("country_movies_distribution_latest")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
+    return await get_stat_response(request, "country_movies_distribution_latest")
 
 @router.get("/distribution/series/countries")
-async def get_tv_countries_distribution():
+async def get_tv_countries_distribution(request: Request):
     """Get the distribution of TV series by country.
 
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+
     Raises:
         HTTPException: If there is an error accessing or parsing the data file
 
@@ -41,15 +78,15 @@ async def get_tv_countries_distribution():
             - total: Total number of series
             - count: Number of unique countries
     """
-    try:
-        return await stats_service.get_json_data("country_series_distribution_latest")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
+    return await get_stat_response(request, "country_series_distribution_latest")
 
 @router.get("/distribution/movies/genres")
-async def get_movies_genres_distribution():
+async def get_movies_genres_distribution(request: Request):
     """Get the distribution of movies by genre.
 
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+
     Raises:
         HTTPException: If there is an error accessing or parsing the data file
 
@@ -59,15 +96,15 @@ async def get_movies_genres_distribution():
             - total: Total number of movies
             - count: Number of unique genres
     """
-    try:
-        return await stats_service.get_json_data("genres_movies_distribution_latest")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
+    return await get_stat_response(request, "genres_movies_distribution_latest")
 
 @router.get("/distribution/series/genres")
-async def get_tv_genres_distribution():
+async def get_tv_genres_distribution(request: Request):
     """Get the distribution of TV series by genre.
 
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+
     Raises:
         HTTPException: If there is an error accessing or parsing the data file
 
@@ -77,15 +114,15 @@ async def get_tv_genres_distribution():
             - total: Total number of series
             - count: Number of unique genres
     """
-    try:
-        return await stats_service.get_json_data("genres_series_distribution_latest")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
+    return await get_stat_response(request, "genres_series_distribution_latest")
 
 @router.get("/distribution/movies/yearly")
-async def get_movies_yearly_distribution():
+async def get_movies_yearly_distribution(request: Request):
     """
 
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+
     Raises:
         HTTPException: If there is an error accessing or parsing the data file
 
@@ -95,15 +132,15 @@ async def get_movies_yearly_distribution():
             - total_ratings: Total number of ratings
             - average_rating: Overall average rating
     """
-    try:
-        return await stats_service.get_json_data("yearly_counts_movies_latest")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
+    return await get_stat_response(request, "yearly_counts_movies_latest")
 
 @router.get("/distribution/series/yearly")
-async def get_series_yearly_distribution():
+async def get_series_yearly_distribution(request: Request):
     """
 
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+
     Raises:
         HTTPException: If there is an error accessing or parsing the data file
 
@@ -113,15 +150,15 @@ async def get_series_yearly_distribution():
             - total_ratings: Total number of ratings
             - average_rating: Overall average rating
     """
-    try:
-        return await stats_service.get_json_data("yearly_counts_series_latest")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
+    return await get_stat_response(request, "yearly_counts_series_latest")
 
 @router.get("/ratings/movies/countries")
-async def get_movies_countries_ratings():
+async def get_movies_countries_ratings(request: Request):
     """Get the average ratings of movies by country.
 
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+
     Raises:
         HTTPException: If there is an error accessing or parsing the data file
 
@@ -131,15 +168,15 @@ async def get_movies_countries_ratings():
             - total_ratings: Total number of ratings
             - average_rating: Overall average rating
     """
-    try:
-        return await stats_service.get_json_data("country_avg_ratings_movies_latest")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
+    return await get_stat_response(request, "country_avg_ratings_movies_latest")
 
 @router.get("/ratings/series/countries")
-async def get_series_countries_ratings():
+async def get_series_countries_ratings(request: Request):
     """Get the average ratings of TV series by country.
 
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+
     Raises:
         HTTPException: If there is an error accessing or parsing the data file
 
@@ -149,15 +186,15 @@ async def get_series_countries_ratings():
             - total_ratings: Total number of ratings
             - average_rating: Overall average rating
     """
-    try:
-        return await stats_service.get_json_data("country_avg_ratings_series_latest")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
+    return await get_stat_response(request, "country_avg_ratings_series_latest")
 
 @router.get("/ratings/movies/genres")
-async def get_movies_genres_ratings():
+async def get_movies_genres_ratings(request: Request):
     """Get the average ratings of movies by genre.
 
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+
     Raises:
         HTTPException: If there is an error accessing or parsing the data file
 
@@ -167,15 +204,15 @@ async def get_movies_genres_ratings():
             - total_ratings: Total number of ratings
             - average_rating: Overall average rating
     """
-    try:
-        return await stats_service.get_json_data("genres_avg_ratings_movies_latest")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
+    return await get_stat_response(request, "genres_avg_ratings_movies_latest")
 
 @router.get("/ratings/series/genres")
-async def get_series_genres_ratings():
+async def get_series_genres_ratings(request: Request):
     """Get the average ratings of TV series by genre.
 
+    Args:
+        request (Request): Incoming request, checked for If-None-Match
+
     Raises:
         HTTPException: If there is an error accessing or parsing the data file
 
@@ -185,7 +222,52 @@ async def get_series_genres_ratings():
             - total_ratings: Total number of ratings
             - average_rating: Overall average rating
     """
+    return await get_stat_response(request, "genres_avg_ratings_series_latest")
+
+@router.get("/bundle")
+async def get_stats_bundle(request: Request, media_type: Optional[str] = None,
+                        keys: Optional[List[str]] = Query(default=None)):
+    """Get several statistics in a single response, read from PostgreSQL in one query.
+
+    Args:
+        request (Request): Incoming request, used to negotiate the compression and checked
+            for If-None-Match
+        media_type (str, optional): 'movies' or 'series', every statistic of this media type
+            is returned when no keys are given. Both media types are returned by default.
+        keys (List[str], optional): Statistics to return as 'stat_type:media_type'
+            (e.g. 'genre_distribution:movies'), may be repeated
+
+    Raises:
+        HTTPException: If a key or media type is unknown (400), or if there is an error
+            accessing the data (500)
+
+    Returns:
+        dict: Statistics grouped as {media_type: {stat_type: data}}
+    """
+    if media_type is not None and media_type not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown media type: {media_type}")
+
+    if keys:
+        stat_keys = []
+        for key in keys:
+            stat_type, _, key_media_type = key.partition(":")
+            if stat_type not in STAT_TYPES or key_media_type not in MEDIA_TYPES:
+                raise HTTPException(status_code=400, detail=f"Unknown stat key: {key}")
+            stat_keys.append((stat_type, key_media_type))
+    else:
+        media_types = [media_type] if media_type else MEDIA_TYPES
+        stat_keys = [(stat_type, m) for m in media_types for stat_type in STAT_TYPES]
+
     try:
-        return await stats_service.get_json_data("genres_avg_ratings_series_latest")
+        # Revalidations only need stats.created_at, the payloads are not read
+        if request.headers.get("if-none-match"):
+            etag = stats_service.get_etag(stat_keys, await stats_service.get_versions(stat_keys))
+            if etag_matches(request, etag):
+                return not_modified(cache_headers(etag, STATS_MAX_AGE))
+        bundle = await stats_service.get_bundle(stat_keys)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
+
+    # Compressed once per bundle, the bytes are kept next to the cached body
+    return precompressed_response(request, bundle.body, bundle.encoded,
+                                cache_headers(bundle.etag, STATS_MAX_AGE))
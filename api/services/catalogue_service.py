@@ -0,0 +1,333 @@
+"""
+@author: Joseph A.
+Description: Query building for the paginated movies and series list endpoints
+"""
+import time
+import dataclasses
+from collections import OrderedDict
+from config.settings import (CATALOGUE_VERSION_TTL, LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL,
+                            LOOKUP_NEGATIVE_TTL)
+from utils.http_cache import make_etag
+from utils.json_response import dumps
+
+# Columns clients may ask for with fields=, by table
+CATALOGUE_COLUMNS = {
+    "movies": ["title", "release_date", "rating", "genre", "tmdb_id", "original_language",
+            "poster_path"],
+    "series": ["title", "first_air_date", "rating", "genre", "tmdb_id", "original_language",
+            "poster_path"],
+}
+
+# Column holding the release date, by table
+DATE_COLUMNS = {"movies": "release_date", "series": "first_air_date"}
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Orders of the list endpoints, only the tmdb_id order can be paged with a cursor
+SORT_ORDERS = ("tmdb_id", "recent")
+
+# Rows encoded per chunk of a streamed export
+EXPORT_BATCH_SIZE = 500
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+# Table where the ETL loader bumps the version of a catalogue table after each load
+VERSIONS_TABLE = "catalogue_versions"
+
+
+def parse_fields(table: str, fields: str = None):
+    """Parse the fields= projection of a list request.
+
+    Args:
+        table (str): 'movies' or 'series'
+        fields (str, optional): Comma-separated column names, every column by default
+
+    Raises:
+        ValueError: If a column is unknown
+
+    Returns:
+        list: Selected columns, tmdb_id is always included as it is the cursor
+    """
+    if not fields:
+        return ["*"]
+
+    columns = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [column for column in columns if column not in CATALOGUE_COLUMNS[table]]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if "tmdb_id" not in columns:
+        columns.append("tmdb_id")
+    return columns
+
+
+def build_list_query(table: str, fields: str = None, after: int = None,
+                    limit: int = DEFAULT_PAGE_SIZE, genre: str = None, language: str = None,
+                    year_min: int = None, year_max: int = None, sort: str = "tmdb_id"):
+    """Build the keyset paginated query of a list endpoint.
+
+    Args:
+        table (str): 'movies' or 'series'
+        fields (str, optional): Comma-separated columns to return
+        after (int, optional): Cursor, only titles with a greater tmdb_id are returned
+        limit (int, optional): Maximum number of titles, None for no limit
+        genre (str, optional): Genre the titles must have
+        language (str, optional): Original language of the titles
+        year_min (int, optional): First release year, included
+        year_max (int, optional): Last release year, included
+        sort (str, optional): 'tmdb_id' or 'recent', the most recently released first.
+            Defaults to 'tmdb_id'.
+
+    Raises:
+        ValueError: If a requested field or the order is unknown, or a cursor is given
+            with the 'recent' order
+
+    Returns:
+        tuple: (query, values) to run with the database
+    """
+    date_column = DATE_COLUMNS[table]
+    conditions = []
+    values = {}
+
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Unknown sort order: {sort}")
+    if sort == "recent" and after is not None:
+        raise ValueError("after can only be used with sort=tmdb_id")
+
+    if after is not None:
+        conditions.append("tmdb_id > :after")
+        values["after"] = after
+    if genre:
+        conditions.append(":genre = ANY(string_to_array(genre, ', '))")
+        values["genre"] = genre
+    if language:
+        conditions.append("original_language = :language")
+        values["language"] = language
+    # Plain date bounds so an index on the date column can be used
+    if year_min is not None:
+        conditions.append(f"{date_column} >= make_date(:year_min, 1, 1)")
+        values["year_min"] = year_min
+    if year_max is not None:
+        conditions.append(f"{date_column} < make_date(:year_max + 1, 1, 1)")
+        values["year_max"] = year_max
+
+    query = f"SELECT {', '.join(parse_fields(table, fields))} FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    if sort == "recent":
+        query += f" ORDER BY {date_column} DESC NULLS LAST, tmdb_id"
+    else:
+        query += " ORDER BY tmdb_id"
+    if limit is not None:
+        query += " LIMIT :limit"
+        values["limit"] = limit
+    return query, values
+
+
+def next_cursor(rows: list, limit: int):
+    """Get the cursor of the next page.
+
+    Args:
+        rows (list): Rows of the current page
+        limit (int): Requested page size
+
+    Returns:
+        str: tmdb_id to pass as after= for the next page, or None on the last page
+    """
+    if limit is None or len(rows) < limit:
+        return None
+    return str(rows[-1]["tmdb_id"])
+
+
+def encode_row(row):
+    """Encode a database row as a JSON object.
+
+    Args:
+        row (Record): Row returned by the database
+
+    Returns:
+        bytes: The JSON object
+    """
+    return dumps(row)
+
+
+async def iter_encoded_batches(db, query: str, values: dict):
+    """Iterate over a query with a server-side cursor, encoding its rows in batches.
+
+    Args:
+        db (Database): Connected database
+        query (str): Query to run
+        values (dict): Values of the query
+
+    Yields:
+        list: Up to EXPORT_BATCH_SIZE JSON encoded rows (bytes)
+    """
+    batch = []
+    async for row in db.iterate(query=query, values=values):
+        batch.append(encode_row(row))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def iter_export(db, query: str, values: dict, export_format: str = "ndjson"):
+    """Stream the rows of a query as NDJSON or as a JSON array, keeping a single
+    batch of rows in memory.
+
+    Args:
+        db (Database): Connected database
+        query (str): Query to run
+        values (dict): Values of the query
+        export_format (str, optional): 'ndjson' or 'json'. Defaults to 'ndjson'.
+
+    Yields:
+        bytes: The next chunk of the response body
+    """
+    if export_format == "ndjson":
+        async for batch in iter_encoded_batches(db, query, values):
+            yield b"\n".join(batch) + b"\n"
+        return
+
+    yield b"["
+    first = True
+    async for batch in iter_encoded_batches(db, query, values):
+        yield (b"" if first else b",") + b",".join(batch)
+        first = False
+    yield b"]"
+
+
+@dataclasses.dataclass
+class CatalogueVersions:
+    """Versions of the movies and series tables, read from the catalogue_versions table
+    filled by the ETL loader and kept in memory for the TTL.
+    """
+    ttl: float = CATALOGUE_VERSION_TTL
+    versions: dict = dataclasses.field(default_factory=dict)
+
+    async def get_version(self, db, table: str):
+        """Get the current version of a catalogue table.
+
+        Args:
+            db (Database): Connected database
+            table (str): 'movies' or 'series'
+
+        Returns:
+            int: Version of the table, None if the loader never recorded one
+        """
+        cached = self.versions.get(table)
+        if cached is not None and time.monotonic() < cached[1]:
+            return cached[0]
+
+        try:
+            version = await db.fetch_val(
+                query=f"SELECT version FROM {VERSIONS_TABLE} WHERE table_name = :table",
+                values={"table": table}
+            )
+        except Exception as e: # pylint: disable=W0718:broad-exception-caught
+            # Without versions the responses are simply served without ETag
+            print(f"Warning: Failed to read the version of {table}: {e}")
+            version = None
+        self.versions[table] = (version, time.monotonic() + self.ttl)
+        return version
+
+    async def get_etag(self, db, table: str):
+        """Get the ETag shared by every representation of a catalogue table.
+
+        Args:
+            db (Database): Connected database
+            table (str): 'movies' or 'series'
+
+        Returns:
+            str: Strong ETag, None if the table has no version
+        """
+        version = await self.get_version(db, table)
+        if version is None:
+            return None
+        return make_etag(table, version)
+
+
+catalogue_versions = CatalogueVersions()
+
+
+@dataclasses.dataclass
+class LookupEntry:
+    """Serialized title kept in a lookup cache, body is None for an unknown tmdb_id.
+    """
+    body: bytes
+    expires_at: float
+    encoded: dict = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass
+class LookupCache:
+    """LRU cache of the titles of a table by tmdb_id, bounded in size and time.
+
+    Unknown ids are cached too (for a shorter TTL) so repeated probes do not reach the
+    database. The cache is emptied whenever the ETL loader bumps the version of the table.
+    """
+    table: str
+    max_size: int = LOOKUP_CACHE_SIZE
+    ttl: float = LOOKUP_CACHE_TTL
+    negative_ttl: float = LOOKUP_NEGATIVE_TTL
+    entries: OrderedDict = dataclasses.field(default_factory=OrderedDict)
+    version: int = None
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    async def get(self, db, tmdb_id: int):
+        """Get a title from the cache, reading it from the database on a miss.
+
+        Args:
+            db (Database): Connected database
+            tmdb_id (int): The tmdb_id of the title
+
+        Returns:
+            LookupEntry: The cached title, its body is None if the title does not exist
+        """
+        version = await catalogue_versions.get_version(db, self.table)
+        if version != self.version:
+            self.entries.clear()
+            self.version = version
+
+        entry = self.entries.get(tmdb_id)
+        if entry is not None and time.monotonic() < entry.expires_at:
+            self.entries.move_to_end(tmdb_id)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        row = await db.fetch_one(query=f"SELECT * FROM {self.table} WHERE tmdb_id = :tmdb_id",
+                                values={"tmdb_id": tmdb_id})
+        if row is None:
+            entry = LookupEntry(body=None, expires_at=time.monotonic() + self.negative_ttl)
+        else:
+            entry = LookupEntry(body=dumps(row), expires_at=time.monotonic() + self.ttl)
+
+        self.entries[tmdb_id] = entry
+        self.entries.move_to_end(tmdb_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def get_stats(self):
+        """Get the counters of the cache, for tuning its size and TTL.
+
+        Returns:
+            dict: Size, hits, misses, evictions and hit ratio
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "version": self.version,
+        }
+
+
+lookup_caches = {"movies": LookupCache("movies"), "series": LookupCache("series")}
@@ -0,0 +1,138 @@
+"""
+@author: Joseph A.
+Description: Queries of the rating history and catalogue churn endpoints, read from the
+append-only history tables filled by the ETL loader
+"""
+from datetime import date, timedelta
+from config.settings import HISTORY_DEFAULT_DAYS
+from utils.http_cache import make_etag
+
+# Tables where the ETL loader appends rating changes and added or removed titles
+RATING_HISTORY_TABLE = "rating_history"
+CATALOGUE_EVENTS_TABLE = "catalogue_events"
+
+MEDIA_TYPES = ("movies", "series")
+
+
+def resolve_window(start: date = None, end: date = None):
+    """Fill in the bounds of a date window.
+
+    Args:
+        start (date, optional): First day, included. Defaults to HISTORY_DEFAULT_DAYS before end.
+        end (date, optional): Last day, included. Defaults to today.
+
+    Raises:
+        ValueError: If start is after end
+
+    Returns:
+        tuple: (start, end) dates
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=HISTORY_DEFAULT_DAYS)
+    if start > end:
+        raise ValueError("start must be before end")
+    return start, end
+
+
+def build_ratings_query(table: str, tmdb_id: int, start: date, end: date):
+    """Build the query of the rating trajectory of a title.
+
+    Only rating changes are stored, so the last change before the window is returned as
+    well: it gives the rating at the start of the window. Both parts are read through the
+    (media_type, tmdb_id, snapshot_date) primary key.
+
+    Args:
+        table (str): 'movies' or 'series'
+        tmdb_id (int): tmdb_id of the title
+        start (date): First day, included
+        end (date): Last day, included
+
+    Returns:
+        tuple: (query, values) to run with the database
+    """
+    query = f"""
+        SELECT snapshot_date AS date, rating FROM (
+            (SELECT snapshot_date, rating FROM {RATING_HISTORY_TABLE}
+            WHERE media_type = :media_type AND tmdb_id = :tmdb_id AND snapshot_date < :start
+            ORDER BY snapshot_date DESC LIMIT 1)
+            UNION ALL
+            (SELECT snapshot_date, rating FROM {RATING_HISTORY_TABLE}
+            WHERE media_type = :media_type AND tmdb_id = :tmdb_id
+            AND snapshot_date BETWEEN :start AND :end)
+        ) trajectory
+        ORDER BY snapshot_date
+    """
+    return query, {"media_type": table, "tmdb_id": tmdb_id, "start": start, "end": end}
+
+
+def build_churn_query(start: date, end: date, media_type: str = None):
+    """Build the query counting the titles added to and removed from the catalogue per day.
+
+    Args:
+        start (date): First day, included
+        end (date): Last day, included
+        media_type (str, optional): 'movies' or 'series', both by default
+
+    Returns:
+        tuple: (query, values) to run with the database
+    """
+    values = {"start": start, "end": end}
+    media_filter = ""
+    if media_type is not None:
+        media_filter = "AND media_type = :media_type"
+        values["media_type"] = media_type
+
+    # The range is served by the BRIN index of event_date
+    query = f"""
+        SELECT event_date AS date, media_type,
+            count(*) FILTER (WHERE event = 'added') AS added,
+            count(*) FILTER (WHERE event = 'removed') AS removed
+        FROM {CATALOGUE_EVENTS_TABLE}
+        WHERE event_date BETWEEN :start AND :end {media_filter}
+        GROUP BY event_date, media_type
+        ORDER BY event_date, media_type
+    """
+    return query, values
+
+
+def summarize_churn(rows: list, start: date, end: date):
+    """Build the churn response from the rows of the churn query.
+
+    Args:
+        rows (list): Rows of build_churn_query
+        start (date): First day of the window
+        end (date): Last day of the window
+
+    Returns:
+        dict: Window, days with titles added or removed, and totals
+    """
+    days = [dict(row._mapping) for row in rows] # pylint: disable=W0212:protected-access
+    return {
+        "start": start,
+        "end": end,
+        "days": days,
+        "total_added": sum(day["added"] for day in days),
+        "total_removed": sum(day["removed"] for day in days),
+    }
+
+
+async def get_history_etag(versions, db, media_types: tuple, start: date, end: date):
+    """Get the ETag of a history window, it changes whenever a load appends to the tables.
+
+    Args:
+        versions (CatalogueVersions): Versions of the catalogue tables
+        db (Database): Connected database
+        media_types (tuple): Tables covered by the response
+        start (date): First day of the window
+        end (date): Last day of the window
+
+    Returns:
+        str: Strong ETag, None if a table has no version
+    """
+    parts = []
+    for table in media_types:
+        version = await versions.get_version(db, table)
+        if version is None:
+            return None
+        parts += [table, version]
+    return make_etag("history", *parts, start, end)
@@ -3,8 +3,14 @@
 Description: Service class for handling statistical data operations from PostgreSQL
 """
 import json
+import time
+import asyncio
 import dataclasses
-from config.db import database
+from datetime import datetime
+from functools import cached_property
+from config.db import get_database
+from config.settings import STATS_CACHE_TTL, STATS_TABLE
+from utils.http_cache import make_etag
 
 # Mapping from old filename to (stat_type, media_type)
 STAT_MAPPING = {
@@ -20,11 +26,223 @@ STAT_MAPPING = {
     "genres_avg_ratings_series_latest": ("genre_avg_ratings", "series"),
 }
 
+STAT_TYPES = sorted({stat_type for stat_type, _ in STAT_MAPPING.values()})
+MEDIA_TYPES = ["movies", "series"]
+
+# Number of distinct bundles kept in memory
+MAX_CACHED_BUNDLES = 32
+
+
+@dataclasses.dataclass
+class CachedStat:
+    """Serialized statistic kept in memory.
+    """
+    body: bytes
+    created_at: datetime
+    expires_at: float
+    encoded: dict = dataclasses.field(default_factory=dict)
+
+    @cached_property
+    def data(self):
+        """Parsed statistic, decoded on first access only.
+        """
+        return json.loads(self.body)
+
+    def is_fresh(self):
+        """Check if the entry can be served without asking the database.
+
+        Returns:
+            bool: True until the TTL of the entry is over
+        """
+        return time.monotonic() < self.expires_at
+
+
+@dataclasses.dataclass
+class CachedBundle:
+    """Several statistics serialized as one JSON payload, with its ETag.
+    """
+    body: bytes
+    version: tuple
+    etag: str
+    encoded: dict = dataclasses.field(default_factory=dict)
+
 
 @dataclasses.dataclass
 class StatisticsService:
     """Service class that provides methods to read statistical data from PostgreSQL.
+
+    Statistics are cached in memory by (stat_type, media_type). Once an entry is older
+    than the TTL, a single coroutine checks stats.created_at and reloads the entry if
+    it changed, while the other requests keep being served the previous entry.
     """
+    ttl: float = STATS_CACHE_TTL
+    cache: dict = dataclasses.field(default_factory=dict)
+    locks: dict = dataclasses.field(default_factory=dict)
+    bundles: dict = dataclasses.field(default_factory=dict)
+    bundle_lock: asyncio.Lock = dataclasses.field(default_factory=asyncio.Lock)
+
+    @staticmethod
+    def get_stat_key(filename: str):
+        """Get the (stat_type, media_type) of a legacy filename.
+
+        Args:
+            filename (str): Legacy filename pattern (for backward compatibility)
+
+        Raises:
+            ValueError: If the filename is not recognized
+
+        Returns:
+            tuple: (stat_type, media_type)
+        """
+        if filename not in STAT_MAPPING:
+            raise ValueError(f"Unknown stat type: {filename}")
+        return STAT_MAPPING[filename]
+
+    async def fetch_entry(self, key: tuple, cached: CachedStat = None):
+        """Load a statistic from PostgreSQL, reusing the cached body if it did not change.
+
+        Args:
+            key (tuple): (stat_type, media_type)
+            cached (CachedStat, optional): Expired entry to revalidate
+
+        Raises:
+            ValueError: If the statistic does not exist
+
+        Returns:
+            CachedStat: The fresh entry
+        """
+        db = await get_database()
+        stat_type, media_type = key
+        values = {"stat_type": stat_type, "media_type": media_type}
+        expires_at = time.monotonic() + self.ttl
+
+        if cached is not None:
+            created_at = await db.fetch_val(
+                query=f"""
+                    SELECT created_at FROM {STATS_TABLE}
+                    WHERE stat_type = :stat_type AND media_type = :media_type
+                """,
+                values=values
+            )
+            if created_at == cached.created_at:
+                cached.expires_at = expires_at
+                return cached
+
+        result = await db.fetch_one(
+            query=f"""
+                SELECT data, created_at FROM {STATS_TABLE}
+                WHERE stat_type = :stat_type AND media_type = :media_type
+            """,
+            values=values
+        )
+
+        if result is None:
+            raise ValueError(f"No data found for {stat_type}/{media_type}")
+
+        return self.build_entry(result, expires_at)
+
+    @staticmethod
+    def build_entry(row, expires_at: float):
+        """Build a cache entry from a row of the stats table.
+
+        Args:
+            row (Record): Row with 'data' and 'created_at' columns
+            expires_at (float): Monotonic time after which the entry must be revalidated
+
+        Returns:
+            CachedStat: The cache entry
+        """
+        data = row["data"]
+        # JSONB is returned as a string by asyncpg, it is already serialized
+        if isinstance(data, str):
+            body = data.encode("utf-8")
+        else:
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        return CachedStat(body=body, created_at=row["created_at"], expires_at=expires_at)
+
+    @staticmethod
+    def build_keys_filter(keys: list):
+        """Build the (stat_type, media_type) IN (...) placeholders of several statistics.
+
+        Args:
+            keys (list): (stat_type, media_type) tuples
+
+        Returns:
+            tuple: (placeholders, values) to use in a query
+        """
+        placeholders = ", ".join(f"(:stat_type_{i}, :media_type_{i})" for i in range(len(keys)))
+        values = {}
+        for i, (stat_type, media_type) in enumerate(keys):
+            values[f"stat_type_{i}"] = stat_type
+            values[f"media_type_{i}"] = media_type
+        return placeholders, values
+
+    async def fetch_entries(self, keys: list):
+        """Load several statistics from PostgreSQL in a single query.
+
+        Args:
+            keys (list): (stat_type, media_type) tuples
+
+        Raises:
+            ValueError: If one of the statistics does not exist
+
+        Returns:
+            dict: CachedStat by (stat_type, media_type)
+        """
+        db = await get_database()
+        placeholders, values = self.build_keys_filter(keys)
+        rows = await db.fetch_all(
+            query=f"""
+                SELECT stat_type, media_type, data, created_at FROM {STATS_TABLE}
+                WHERE (stat_type, media_type) IN ({placeholders})
+            """,
+            values=values
+        )
+
+        expires_at = time.monotonic() + self.ttl
+        entries = {(row["stat_type"], row["media_type"]): self.build_entry(row, expires_at)
+                for row in rows}
+        for stat_type, media_type in keys:
+            if (stat_type, media_type) not in entries:
+                raise ValueError(f"No data found for {stat_type}/{media_type}")
+        return entries
+
+    async def get_entry(self, filename: str):
+        """Get the cached entry of a statistic, loading or revalidating it when needed.
+
+        Args:
+            filename (str): Legacy filename pattern (for backward compatibility)
+
+        Returns:
+            CachedStat: The cached statistic
+
+        Raises:
+            ValueError: If the filename is not recognized or the statistic does not exist
+            Exception: If there's an error fetching from database
+        """
+        key = self.get_stat_key(filename)
+        cached = self.cache.get(key)
+        if cached is not None and cached.is_fresh():
+            return cached
+
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        # Somebody is already refreshing this entry, serve the previous one meanwhile
+        if cached is not None and lock.locked():
+            return cached
+
+        async with lock:
+            cached = self.cache.get(key)
+            if cached is not None and cached.is_fresh():
+                return cached
+            try:
+                self.cache[key] = await self.fetch_entry(key, cached)
+            except Exception as e:
+                if cached is None:
+                    raise
+                # Keep serving the previous entry while the database is unavailable
+                print(f"Warning: Failed to refresh {key}, serving cached data: {e}")
+                return cached
+            return self.cache[key]
 
     async def get_json_data(self, filename: str):
         """Read and return statistical data from PostgreSQL.
@@ -39,25 +257,117 @@ class StatisticsService:
             ValueError: If the filename is not recognized
             Exception: If there's an error fetching from database
         """
-        if filename not in STAT_MAPPING:
-            raise ValueError(f"Unknown stat type: {filename}")
+        return (await self.get_entry(filename)).data
+
+    async def get_entries(self, keys: list):
+        """Get the cached entries of several statistics, loading every missing or
+        expired one in a single query.
+
+        Args:
+            keys (list): (stat_type, media_type) tuples
+
+        Returns:
+            dict: CachedStat by (stat_type, media_type)
+        """
+        entries = {key: self.cache.get(key) for key in keys}
+        expired = [key for key, cached in entries.items()
+                if cached is None or not cached.is_fresh()]
+        if not expired:
+            return entries
+
+        # Somebody is already refreshing, serve the previous entries meanwhile
+        if self.bundle_lock.locked() and all(entries[key] is not None for key in expired):
+            return entries
+
+        async with self.bundle_lock:
+            expired = [key for key in expired
+                    if self.cache.get(key) is None or not self.cache[key].is_fresh()]
+            if expired:
+                self.cache.update(await self.fetch_entries(expired))
+        return {key: self.cache[key] for key in keys}
 
-        stat_type, media_type = STAT_MAPPING[filename]
+    async def get_versions(self, keys: list):
+        """Get the created_at of several statistics without reading their payloads, from the
+        cache when fresh and with a single query otherwise.
 
-        query = """
-            SELECT data FROM stats
-            WHERE stat_type = :stat_type AND media_type = :media_type
+        Args:
+            keys (list): (stat_type, media_type) tuples
+
+        Returns:
+            dict: created_at by (stat_type, media_type), missing statistics are left out
         """
-        result = await database.fetch_one(
-            query=query,
-            values={"stat_type": stat_type, "media_type": media_type}
+        versions = {key: self.cache[key].created_at for key in keys
+                    if key in self.cache and self.cache[key].is_fresh()}
+        missing = [key for key in keys if key not in versions]
+        if not missing:
+            return versions
+
+        db = await get_database()
+        placeholders, values = self.build_keys_filter(missing)
+        rows = await db.fetch_all(
+            query=f"""
+                SELECT stat_type, media_type, created_at FROM {STATS_TABLE}
+                WHERE (stat_type, media_type) IN ({placeholders})
+            """,
+            values=values
         )
+        versions.update({(row["stat_type"], row["media_type"]): row["created_at"]
+                        for row in rows})
+        return versions
 
-        if result is None:
-            raise ValueError(f"No data found for {stat_type}/{media_type}")
+    @staticmethod
+    def get_etag(keys: list, versions: dict):
+        """Build the ETag of one or several statistics.
 
-        data = result["data"]
-        # Parse JSON if data is a string (JSONB might be returned as string)
-        if isinstance(data, str):
-            return json.loads(data)
-        return data
+        Args:
+            keys (list): (stat_type, media_type) tuples
+            versions (dict): created_at by (stat_type, media_type)
+
+        Returns:
+            str: Strong ETag, changing whenever one of the statistics is rewritten
+        """
+        keys = sorted(set(keys))
+        return make_etag(*keys, *(versions.get(key) for key in keys))
+
+    async def get_bundle(self, keys: list):
+        """Get several statistics as one JSON payload {media_type: {stat_type: data}}.
+
+        Args:
+            keys (list): (stat_type, media_type) tuples
+
+        Raises:
+            ValueError: If one of the statistics does not exist
+
+        Returns:
+            CachedBundle: The serialized payload
+        """
+        keys = sorted(set(keys))
+        entries = await self.get_entries(keys)
+        version = tuple(entries[key].created_at for key in keys)
+
+        cached = self.bundles.get(tuple(keys))
+        if cached is not None and cached.version == version:
+            return cached
+
+        # Entries are already serialized, the payload is assembled without re-encoding them
+        parts = []
+        for media_type in MEDIA_TYPES:
+            stats = [f'{json.dumps(stat_type)}:'.encode("utf-8") + entries[(stat_type, m)].body
+                    for stat_type, m in keys if m == media_type]
+            if stats:
+                parts.append(f'{json.dumps(media_type)}:{{'.encode("utf-8")
+                            + b",".join(stats) + b"}")
+        body = b"{" + b",".join(parts) + b"}"
+
+        if len(self.bundles) >= MAX_CACHED_BUNDLES:
+            self.bundles.clear()
+        bundle = CachedBundle(body=body, version=version,
+                            etag=self.get_etag(keys, dict(zip(keys, version))))
+        self.bundles[tuple(keys)] = bundle
+        return bundle
+
+    def invalidate(self):
+        """Drop every cached statistic.
+        """
+        self.cache.clear()
+        self.bundles.clear()
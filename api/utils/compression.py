@@ -0,0 +1,212 @@
+"""
+@author: Joseph A.
+Description: Negotiated gzip/brotli compression of the API responses, with a middleware for
+dynamic responses and a helper serving bodies compressed once and kept in a cache.
+"""
+import gzip
+import zlib
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from config.settings import (COMPRESSION_MIN_SIZE, GZIP_LEVEL, BROTLI_QUALITY,
+                            PRECOMPRESSED_GZIP_LEVEL, PRECOMPRESSED_BROTLI_QUALITY)
+from utils.http_cache import parse_if_none_match, variant_etag
+
+try:
+    import brotli
+except ImportError: # brotli is optional, gzip is used without it
+    brotli = None
+
+# Supported encodings, by order of preference
+ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def negotiate_encoding(accept_encoding: str):
+    """Pick the content encoding of a response from the Accept-Encoding header.
+
+    Args:
+        accept_encoding (str): Accept-Encoding header of the request
+
+    Returns:
+        str: 'br' or 'gzip', None if the client accepts neither
+    """
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip()] = weight
+
+    candidates = [(weights.get(encoding, weights.get("*", 0.0)), -rank, encoding)
+                for rank, encoding in enumerate(ENCODINGS)]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+def compress(body: bytes, encoding: str, precompressed: bool = False):
+    """Compress a whole body.
+
+    Args:
+        body (bytes): Body to compress
+        encoding (str): 'br' or 'gzip'
+        precompressed (bool, optional): Use the denser settings of cached bodies.
+            Defaults to False.
+
+    Returns:
+        bytes: The compressed body
+    """
+    if encoding == "br":
+        quality = PRECOMPRESSED_BROTLI_QUALITY if precompressed else BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    level = PRECOMPRESSED_GZIP_LEVEL if precompressed else GZIP_LEVEL
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class StreamCompressor:
+    """Compress a streamed body chunk by chunk.
+    """
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self.encoding = encoding
+
+    def compress(self, chunk: bytes):
+        """Compress the next chunk, flushed so the client receives it right away.
+
+        Args:
+            chunk (bytes): Chunk of the body
+
+        Returns:
+            bytes: Compressed data
+        """
+        if self.encoding == "br":
+            return self.compressor.process(chunk) + self.compressor.flush()
+        return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        """End the stream.
+
+        Returns:
+            bytes: The remaining compressed data
+        """
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+def precompressed_response(request: Request, body: bytes, encoded: dict, headers: dict = None,
+                        media_type: str = "application/json"):
+    """Serve a cached body in the encoding negotiated with the client, compressing it on
+    the first request only.
+
+    Args:
+        request (Request): Incoming request
+        body (bytes): Uncompressed body
+        encoded (dict): Compressed bodies by encoding, stored next to the cached body
+        headers (dict, optional): Headers of the response (ETag, Cache-Control)
+        media_type (str, optional): Content type. Defaults to 'application/json'.
+
+    Returns:
+        Response: The body, compressed when the client accepts it and the body is large enough
+    """
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is None or len(body) < COMPRESSION_MIN_SIZE:
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    if encoding not in encoded:
+        encoded[encoding] = compress(body, encoding, precompressed=True)
+    headers["Content-Encoding"] = encoding
+    if "ETag" in headers:
+        headers["ETag"] = variant_etag(headers["ETag"], encoding)
+    return Response(content=encoded[encoding], media_type=media_type, headers=headers)
+
+
+class CompressionMiddleware:
+    """Compress the JSON and NDJSON responses with gzip or brotli. Responses that already
+    have a Content-Encoding (precompressed cached bodies) are sent untouched, streamed
+    responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = parse_if_none_match(request_headers.get("if-none-match", ""))
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is not None:
+                data = compressor.compress(body)
+                if not more_body:
+                    data += compressor.finish()
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            content_type = headers.get("content-type", "")
+            if start["status"] == 304:
+                # Keep the ETag of the variant the client holds
+                etag = headers.get("etag")
+                if etag and variant_etag(etag, encoding) in if_none_match:
+                    headers["ETag"] = variant_etag(etag, encoding)
+                passthrough = True
+            elif ("content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)):
+                passthrough = True
+            if passthrough:
+                await send(start)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                headers["ETag"] = variant_etag(headers["etag"], encoding)
+            if more_body:
+                del headers["content-length"]
+                compressor = StreamCompressor(encoding)
+                data = compressor.compress(body)
+            else:
+                data = compress(body, encoding)
+                headers["Content-Length"] = str(len(data))
+            await send(start)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,108 @@
+"""
+@author: Joseph A.
+Description: ETag and Cache-Control helpers for conditional GET requests.
+"""
+import hashlib
+from fastapi import Request, Response
+
+# Content encodings whose variants get their own ETag
+VARIANT_ENCODINGS = ("gzip", "br")
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the values identifying a representation.
+
+    Args:
+        *parts (Any): Values that change whenever the response body changes
+
+    Returns:
+        str: Quoted ETag
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8"))
+    return f'"{digest.hexdigest()[:20]}"'
+
+
+def variant_etag(etag: str, encoding: str):
+    """Get the ETag of an encoded variant of a representation.
+
+    Args:
+        etag (str): ETag of the identity representation
+        encoding (str): Content-Encoding of the variant (e.g. 'gzip')
+
+    Returns:
+        str: Quoted ETag, distinct for each encoding
+    """
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def parse_if_none_match(header: str):
+    """Parse the ETags of an If-None-Match header.
+
+    Args:
+        header (str): If-None-Match header of the request
+
+    Returns:
+        set: Quoted ETags, W/ prefixes removed as If-None-Match uses the weak comparison
+    """
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+def strip_variant(etag: str):
+    """Get the ETag of the identity representation from the ETag of an encoded variant.
+
+    Args:
+        etag (str): Quoted ETag
+
+    Returns:
+        str: Quoted ETag without its encoding suffix
+    """
+    for encoding in VARIANT_ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def etag_matches(request: Request, etag: str):
+    """Check the If-None-Match header of a request against the current ETag.
+
+    Args:
+        request (Request): Incoming request
+        etag (str): Current ETag of the identity representation, the ETags of its
+            encoded variants match as well
+
+    Returns:
+        bool: True if the client already holds the current representation
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in {strip_variant(tag) for tag in parse_if_none_match(header)}
+
+
+def cache_headers(etag: str, max_age: int):
+    """Build the validation headers of a cacheable response.
+
+    Args:
+        etag (str): ETag of the response
+        max_age (int): Seconds during which caches may serve the response without revalidating
+
+    Returns:
+        dict: ETag and Cache-Control headers
+    """
+    return {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+
+
+def not_modified(headers: dict):
+    """Build an empty 304 response. It varies on Accept-Encoding like the full response,
+    which is compressed when the client accepts it.
+
+    Args:
+        headers (dict): Headers the full response would carry (ETag, Cache-Control)
+
+    Returns:
+        Response: The 304 response
+    """
+    return Response(status_code=304, headers={**(headers or {}), "Vary": "Accept-Encoding"})
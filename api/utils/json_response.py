@@ -0,0 +1,50 @@
+"""
+@author: Joseph A.
+Description: Fast JSON serialization of the API responses with orjson.
+"""
+from decimal import Decimal
+import orjson
+from fastapi.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def orjson_default(value):
+    """Encode the values orjson does not know.
+
+    Args:
+        value (Any): Value to encode
+
+    Raises:
+        TypeError: If the value cannot be encoded
+
+    Returns:
+        Any: A value orjson can encode (database rows become dicts)
+    """
+    # databases Record, its mapping is the driver row
+    if hasattr(value, "_mapping"):
+        return dict(value._mapping)
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content):
+    """Serialize content to JSON bytes.
+
+    Args:
+        content (Any): Records, dicts, lists and scalars
+
+    Returns:
+        bytes: UTF-8 encoded JSON
+    """
+    return orjson.dumps(content, default=orjson_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson. Routes returning it directly skip
+    FastAPI's jsonable_encoder pass, database records are encoded as they are.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -11,6 +11,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from netflix.extractors import extract_netflix_data
 from netflix.loaders import load_to_postgres, load_to_mongo
+from netflix.incremental import acknowledge_extraction
 from airflow import DAG
 from airflow.providers.standard.operators.python import PythonOperator
 
@@ -53,5 +54,12 @@ load_mongo_task = PythonOperator(
     dag=dag
 )
 
+# Runs only once both loads committed, a failed load keeps the changes for the next extraction
+acknowledge_task = PythonOperator(
+    task_id='acknowledge_extraction',
+    python_callable=acknowledge_extraction,
+    dag=dag
+)
+
 # Task Dependencies
-extract_task >> [load_postgres_task, load_mongo_task]
+extract_task >> [load_postgres_task, load_mongo_task] >> acknowledge_task
@@ -20,16 +20,47 @@ TMDB_API_KEY = os.getenv('TMDB_API_KEY')
 TMDB_BASE_URL = 'https://api.themoviedb.org/3'
 PROVIDER_ID = 8
 WATCH_REGION = 'FR'
+TMDB_MAX_PAGES = 500 # TMDB refuses to serve discover pages beyond 500
+
+# TMDB extraction engine
+TMDB_MAX_CONCURRENCY = int(os.getenv('TMDB_MAX_CONCURRENCY', '10')) # Requests in flight
+TMDB_RATE_LIMIT = float(os.getenv('TMDB_RATE_LIMIT', '40')) # Requests per second per host
+TMDB_MAX_RETRIES = int(os.getenv('TMDB_MAX_RETRIES', '5'))
+TMDB_TIMEOUT = 10 # Seconds
+
+# DDL of the genre and country tables, shared with the statistics engine
+LINK_TABLES_SQL = os.path.join(ETL_DIR, 'sql', 'link_tables.sql')
 
 # Output directory (absolute path)
 OUTPUT_DIR = os.path.join(ETL_DIR, 'tmdb_data')
 
+# Extracted files - newline-delimited JSON, compression: 'none', 'gzip' or 'zstd'
+OUTPUT_COMPRESSION = os.getenv('OUTPUT_COMPRESSION', 'gzip').lower()
+LOAD_CHUNK_SIZE = int(os.getenv('LOAD_CHUNK_SIZE', '1000')) # Records read at once by the loaders
+
+# Incremental extraction - only new or changed titles are pushed downstream
+INCREMENTAL = os.getenv('ETL_INCREMENTAL', 'true').lower() == 'true'
+FINGERPRINTS_FILE = os.path.join(OUTPUT_DIR, 'fingerprints.json')
+# Fingerprints of the last extraction, promoted once the loaders committed it
+PENDING_FINGERPRINTS_FILE = os.path.join(OUTPUT_DIR, 'fingerprints.pending.json')
+MANIFEST_FILE = os.path.join(OUTPUT_DIR, 'delta_manifest.json')
+
 # Databases
 MONGO_DB_NAME = os.getenv('MONGO_DB_NAME')
 MONGO_DB_HOST = os.getenv('MONGO_DB_HOST')
 POSTGRES_DB_NAME = os.getenv('POSTGRES_DB_NAME')
 DATABASE_URL = os.getenv('DATABASE_URL')
 
+# MongoDB bulk loading - 'w' is a number of nodes or 'majority'
+MONGO_BATCH_SIZE = int(os.getenv('MONGO_BATCH_SIZE', '1000'))
+MONGO_WRITE_CONCERN_W = os.getenv('MONGO_WRITE_CONCERN_W', '1')
+MONGO_WRITE_CONCERN_J = os.getenv('MONGO_WRITE_CONCERN_J', 'false').lower() == 'true'
+
+# Postgres bulk loading - COPY into a staging table, execute_values paging as fallback
+POSTGRES_USE_COPY = os.getenv('POSTGRES_USE_COPY', 'true').lower() == 'true'
+POSTGRES_PAGE_SIZE = int(os.getenv('POSTGRES_PAGE_SIZE', '1000'))
+POSTGRES_UPDATE_EXISTING = os.getenv('POSTGRES_UPDATE_EXISTING', 'true').lower() == 'true'
+
 # Create the output directory if does not exist
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
@@ -2,70 +2,137 @@
 @author: Joseph A.
 Description: This script extracts data from the TMDB API about Netflix movies and series.
 """
-import json
-import requests
-from .config import TMDB_API_KEY, PROVIDER_ID, WATCH_REGION, TMDB_BASE_URL, OUTPUT_DIR, LOGGER
+import os
+import asyncio
+from datetime import date
+from .config import (PROVIDER_ID, WATCH_REGION, TMDB_BASE_URL, TMDB_MAX_PAGES, INCREMENTAL,
+                    LOGGER)
+from .incremental import (ChangeTracker, data_file, load_fingerprints, save_fingerprints,
+                        save_manifest)
+from .streaming import NDJSONWriter
+from .tmdb_client import TMDBClient
+
+MEDIA_LABELS = {'movie': 'movies', 'tv': 'tv show'}
+
+async def fetch_discover_page(client:TMDBClient, media:str, page:int):
+    """Fetch one page of the discover endpoint of a media type.
+
+    Args:
+        client (TMDBClient): Opened TMDB client
+        media (str): Type of media ('movie' or 'tv')
+        page (int): Number of the page to fetch
+
+    Returns:
+        dict: The decoded page, with 'results' and 'total_pages' keys
+    """
+    params = {
+        'with_watch_providers': PROVIDER_ID,
+        'watch_region': WATCH_REGION,
+        'page': page
+    }
+    LOGGER.info(f"🔄 Request for {MEDIA_LABELS[media]} - Page {page}")
+
+    try:
+        data = await client.get_json(f'{TMDB_BASE_URL}/discover/{media}', params)
+    except Exception as e:
+        LOGGER.error(f"❌ Error while getting {MEDIA_LABELS[media]} - Page {page}: {str(e)}")
+        raise
+
+    LOGGER.info(f"✅ Recovered {MEDIA_LABELS[media]} -  Page {page}: {len(data['results'])} items")
+    return data
+
+async def iter_discover(client:TMDBClient, media:str):
+    """Fetch every discover page of a media type, following 'total_pages'.
+
+    Args:
+        client (TMDBClient): Opened TMDB client
+        media (str): Type of media ('movie' or 'tv')
+
+    Yields:
+        dict: The decoded pages, in completion order
+    """
+    first_page = await fetch_discover_page(client, media, 1)
+    yield first_page
+
+    total_pages = min(first_page.get('total_pages', 1), TMDB_MAX_PAGES)
+    for next_page in asyncio.as_completed([fetch_discover_page(client, media, page)
+                                        for page in range(2, total_pages + 1)]):
+        yield await next_page
+
+async def extract_media(client:TMDBClient, media:str, fingerprints:dict, today:str):
+    """Stream the titles of a media type to the file read by the loaders as pages arrive.
+
+    In incremental mode only the new or changed titles are written, the full
+    catalogue is written otherwise. Titles seen twice while paging are written once.
+
+    Args:
+        client (TMDBClient): Opened TMDB client
+        media (str): Type of media ('movie' or 'tv')
+        fingerprints (dict): Stored fingerprints, updated in place
+        today (str): Date of the extraction (ISO format)
+
+    Returns:
+        tuple: (extracted, summary) number of distinct titles extracted and
+            summary of the changes
+    """
+    tracker = ChangeTracker(media, fingerprints, today)
+    writer = NDJSONWriter(data_file(media))
+    try:
+        async for page in iter_discover(client, media):
+            for item in page['results']:
+                status = tracker.track(item)
+                if status in ('added', 'changed') or (status == 'unchanged' and not INCREMENTAL):
+                    writer.write(item)
+    except BaseException: # Cancellation too, or the temporary file would be left behind
+        writer.abort()
+        raise
+    writer.close()
+
+    LOGGER.info(f'✅ {writer.count} {MEDIA_LABELS[media]} save in {os.path.basename(writer.path)}')
+    return len(tracker.current), tracker.finish()
+
+async def extract_all(fingerprints:dict, today:str):
+    """Extract movies and tv shows in parallel through a single shared client.
+
+    Args:
+        fingerprints (dict): Stored fingerprints, updated in place
+        today (str): Date of the extraction (ISO format)
+
+    Returns:
+        dict: (extracted, summary) of extract_media for each media type
+    """
+    async with TMDBClient() as client:
+        movies, series = await asyncio.gather(
+            extract_media(client, 'movie', fingerprints, today),
+            extract_media(client, 'tv', fingerprints, today))
+    return {'movie': movies, 'tv': series}
 
 def extract_netflix_data():
     """Extract data from the TMDB API about Netflix movies and series.
+
+    In incremental mode only the new or changed titles are saved for the loaders,
+    the full catalogue is saved otherwise. A delta manifest is written in both modes.
     """
     LOGGER.info("🎬 Launch of extraction of Netflix films and series data from TMDB API")
-    netflix_movies = []
-    netflix_series = []
-
-    for page in range(1, 6): # We will get the first 5 pages (20 movies per page)
-        params = {
-            'api_key': TMDB_API_KEY,
-            'with_watch_providers': PROVIDER_ID,
-            'watch_region': WATCH_REGION,
-            'page': page
-        }
-
-        try:
-            # Movies
-            url = f'{TMDB_BASE_URL}/discover/movie'
-            LOGGER.info(f"🔄 Request for movies - Page {page}")
-
-            response = requests.get(url, params=params, timeout=10)
-            if response.status_code != 200:
-                error_msg = f"❌ Error while getting movies - Page {page}: {response.status_code}"
-                LOGGER.error(error_msg)
-                raise ValueError(error_msg)
-
-            data = response.json()
-            netflix_movies.extend(data['results'])
-            LOGGER.info(f"✅ Recovered movies -  Page {page}: {len(data['results'])} movies")
-
-            # Tv Shows
-            url_series = f'{TMDB_BASE_URL}/discover/tv'
-            LOGGER.info(f"🔄 Request for tv show - Page {page}")
-
-            response_tv = requests.get(url_series, params=params, timeout=10)
-            if response_tv.status_code != 200:
-                error_msg = f"❌ Error while getting series - Page {page}: {response_tv.status_code}"
-                LOGGER.error(error_msg)
-                raise ValueError(error_msg)
-
-            data_series = response_tv.json()
-            netflix_series.extend(data_series['results'])
-            LOGGER.info(f"✅ Recovered tv show -  Page {page}: {len(data_series['results'])} series")
-        except Exception as e:
-            LOGGER.error(f"❌ Error during API request: {str(e)}")
-            raise
-
-    # Save the data
-    if netflix_movies:
-        with open(f'{OUTPUT_DIR}/netflix_movies.json', 'w', encoding='utf-8') as f:
-            json.dump(netflix_movies, f)
-        LOGGER.info(f'✅ {len(netflix_movies)} movies save in netflix_movies.json')
-    else:
-        LOGGER.warning('❌ No movies found')
-
-    if netflix_series:
-        with open(f'{OUTPUT_DIR}/netflix_series.json', 'w', encoding='utf-8') as f:
-            json.dump(netflix_series, f)
-        LOGGER.info(f'✅ {len(netflix_series)} series save in netflix_series.json')
-    else:
-        LOGGER.warning('❌ No series found')
-
-    LOGGER.info(f'✅ Extraction complete : {len(netflix_movies)} movies, {len(netflix_series)} tv')
+
+    today = date.today().isoformat()
+    fingerprints = load_fingerprints()
+
+    try:
+        results = asyncio.run(extract_all(fingerprints, today))
+    except Exception as e:
+        LOGGER.error(f"❌ Error during API request: {str(e)}")
+        raise
+
+    summaries = {}
+    for media, (extracted, summary) in results.items():
+        if not extracted:
+            LOGGER.warning(f'❌ No {MEDIA_LABELS[media]} found')
+        LOGGER.info(f"🔍 {MEDIA_LABELS[media]}: {len(summary['added'])} added, "
+                    f"{len(summary['changed'])} changed, {len(summary['removed'])} removed")
+        summaries[media] = summary
+
+    save_manifest(summaries, today)
+    save_fingerprints(fingerprints)
+
+    LOGGER.info(f"✅ Extraction complete : {results['movie'][0]} movies, {results['tv'][0]} tv")
@@ -0,0 +1,190 @@
+"""
+@author: Joseph A.
+Description: This script detects new, changed and removed titles between two extractions.
+"""
+import os
+import json
+import hashlib
+from datetime import datetime
+from .config import (OUTPUT_DIR, INCREMENTAL, FINGERPRINTS_FILE, PENDING_FINGERPRINTS_FILE,
+                    MANIFEST_FILE)
+from .streaming import extension
+
+# TMDB fields used downstream, a change in any of them makes the title reloaded
+FINGERPRINT_FIELDS = {
+    'movie': ['title', 'release_date', 'vote_average', 'genre_ids', 'original_language',
+            'poster_path'],
+    'tv': ['name', 'first_air_date', 'vote_average', 'genre_ids', 'original_language',
+        'poster_path'],
+}
+
+# Name of the extracted files of each media type
+FILE_NAMES = {'movie': 'netflix_movies', 'tv': 'netflix_series'}
+
+def data_file(media:str, incremental:bool = INCREMENTAL):
+    """Get the path of the file the loaders must read for a media type.
+
+    Args:
+        media (str): Type of media ('movie' or 'tv')
+        incremental (bool, optional): Read the delta instead of the full snapshot.
+            Defaults to the ETL_INCREMENTAL setting.
+
+    Returns:
+        str: Absolute path of the NDJSON file
+    """
+    suffix = '_delta' if incremental else ''
+    return os.path.join(OUTPUT_DIR, f'{FILE_NAMES[media]}{suffix}{extension()}')
+
+def fingerprint(item:dict, media:str):
+    """Hash the relevant TMDB fields of a title.
+
+    Args:
+        item (dict): TMDB result of the title
+        media (str): Type of media ('movie' or 'tv')
+
+    Returns:
+        str: Hex digest of the relevant fields
+    """
+    values = [item.get(field) for field in FINGERPRINT_FIELDS[media]]
+    payload = json.dumps(values, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def load_fingerprints():
+    """Load the fingerprints of the last extraction acknowledged by the loaders. The titles
+    of an extraction that was never loaded are compared with them again, so its changes are
+    pushed downstream by the next extraction instead of being lost.
+
+    Returns:
+        dict: {media: {tmdb_id: {'hash': str, 'last_seen': str}}}, empty on the first run
+    """
+    if not os.path.exists(FINGERPRINTS_FILE):
+        return {'movie': {}, 'tv': {}}
+    with open(FINGERPRINTS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_fingerprints(fingerprints:dict):
+    """Save the fingerprints of the extraction as pending, acknowledge_extraction
+    promotes them once the loaders committed the extracted data.
+
+    Args:
+        fingerprints (dict): Fingerprints returned by load_fingerprints and updated by ChangeTracker
+    """
+    tmp_file = f'{PENDING_FINGERPRINTS_FILE}.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(fingerprints, f)
+    os.replace(tmp_file, PENDING_FINGERPRINTS_FILE)
+
+class ChangeTracker:
+    """Compare the titles of a media type, one at a time as they are extracted,
+    with the fingerprints of the previous extraction.
+    """
+
+    def __init__(self, media:str, fingerprints:dict, today:str):
+        self.media = media
+        self.fingerprints = fingerprints
+        self.previous = fingerprints.setdefault(media, {})
+        self.current = {}
+        self.today = today
+        self.summary = {'added': [], 'changed': [], 'removed': []}
+
+    def track(self, item:dict):
+        """Record an extracted title.
+
+        Args:
+            item (dict): TMDB result of the title
+
+        Returns:
+            str: 'added', 'changed', 'unchanged' or 'duplicate' if the title was already
+                tracked during this extraction
+        """
+        key = str(item['id'])
+        if key in self.current:
+            return 'duplicate'
+
+        digest = fingerprint(item, self.media)
+        self.current[key] = {'hash': digest, 'last_seen': self.today}
+
+        if key not in self.previous:
+            status = 'added'
+        elif self.previous[key]['hash'] != digest:
+            status = 'changed'
+        else:
+            return 'unchanged'
+        self.summary[status].append(item['id'])
+        return status
+
+    def finish(self):
+        """Find the removed titles and replace the stored fingerprints of the media type.
+
+        An empty extraction is a failed one, not an emptied catalogue: the stored
+        fingerprints are kept and nothing is reported as removed.
+
+        Returns:
+            dict: tmdb_ids of 'added', 'changed' and 'removed' titles
+        """
+        if self.current:
+            self.summary['removed'] = [int(key) for key in self.previous
+                                    if key not in self.current]
+            self.fingerprints[self.media] = self.current
+        return self.summary
+
+def save_manifest(summaries:dict, today:str, incremental:bool = INCREMENTAL):
+    """Write the delta manifest describing what the extraction pushed downstream.
+
+    Args:
+        summaries (dict): Summary of ChangeTracker.finish for each media type
+        today (str): Date of the extraction (ISO format)
+        incremental (bool, optional): Mode of the extraction.
+            Defaults to the ETL_INCREMENTAL setting.
+    """
+    # Lets the consumers of the manifest detect an extraction they did not apply. The delta
+    # is computed against the last acknowledged extraction, an unloaded one is skipped over.
+    previous = load_manifest() or {}
+    if previous.get('acknowledged'):
+        previous_extracted_at = previous.get('extracted_at')
+    else:
+        previous_extracted_at = previous.get('previous_extracted_at')
+    manifest = {
+        'date': today,
+        'extracted_at': datetime.now().isoformat(timespec='seconds'),
+        'previous_extracted_at': previous_extracted_at,
+        'mode': 'incremental' if incremental else 'full',
+        'acknowledged': False,
+        **{media: {**summary, 'file': os.path.basename(data_file(media, incremental))}
+        for media, summary in summaries.items()}
+    }
+    write_manifest(manifest)
+
+def write_manifest(manifest:dict):
+    """Write the delta manifest atomically.
+
+    Args:
+        manifest (dict): Manifest built by save_manifest
+    """
+    tmp_file = f'{MANIFEST_FILE}.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_file, MANIFEST_FILE)
+
+def load_manifest():
+    """Load the delta manifest of the last extraction.
+
+    Returns:
+        dict: Manifest written by save_manifest, None if no extraction wrote one
+    """
+    if not os.path.exists(MANIFEST_FILE):
+        return None
+    with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def acknowledge_extraction():
+    """Promote the pending fingerprints and mark the manifest as acknowledged, once every
+    loader committed the extracted data. Until then, the next extraction still reports
+    the changes of this one.
+    """
+    if os.path.exists(PENDING_FINGERPRINTS_FILE):
+        os.replace(PENDING_FINGERPRINTS_FILE, FINGERPRINTS_FILE)
+    manifest = load_manifest()
+    if manifest is not None and not manifest.get('acknowledged'):
+        manifest['acknowledged'] = True
+        write_manifest(manifest)
@@ -2,13 +2,75 @@
 @author: Joseph A.
 Description: This script loads the extracted data into the databases.
 """
-import json
+import io
+import time
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 import requests
 import psycopg2
-from pymongo import MongoClient, UpdateOne
-from .config import (TMDB_BASE_URL, TMDB_API_KEY, OUTPUT_DIR, LOGGER,
-                    DATABASE_URL, MONGO_DB_HOST, MONGO_DB_NAME)
+from psycopg2.extras import execute_values
+from pymongo import MongoClient, UpdateOne, WriteConcern
+from pymongo.errors import OperationFailure
+from .config import (TMDB_BASE_URL, TMDB_API_KEY, LOGGER,
+                    DATABASE_URL, MONGO_DB_HOST, MONGO_DB_NAME, POSTGRES_USE_COPY,
+                    POSTGRES_PAGE_SIZE, POSTGRES_UPDATE_EXISTING, LOAD_CHUNK_SIZE,
+                    MONGO_BATCH_SIZE, MONGO_WRITE_CONCERN_W, MONGO_WRITE_CONCERN_J,
+                    LINK_TABLES_SQL)
+from .incremental import data_file, load_manifest
+from .streaming import iter_ndjson, iter_chunks
+
+# Postgres table and loaded columns of each media type
+POSTGRES_TABLES = {
+    'movie': ('movies', ['title', 'release_date', 'rating', 'genre', 'tmdb_id',
+                        'original_language', 'poster_path']),
+    'tv': ('series', ['title', 'first_air_date', 'rating', 'genre', 'tmdb_id',
+                    'original_language', 'poster_path']),
+}
+
+# MongoDB collection of each media type
+MONGO_COLLECTIONS = {'movie': 'movies', 'tv': 'series'}
+
+# Version of each Postgres table, read by the API to validate its caches and ETags
+VERSIONS_TABLE = 'catalogue_versions'
+
+# Normalized genres and origin countries of the titles, joined by the statistics
+with open(LINK_TABLES_SQL, 'r', encoding='utf-8') as f:
+    LINK_TABLES_DDL = f.read()
+
+# Append-only history of the ratings and of the catalogue membership. A rating is recorded
+# only when it differs from the previous one of the title, BRIN indexes keep date range scans
+# cheap as rows are appended in date order
+HISTORY_TABLES_DDL = """
+    CREATE TABLE IF NOT EXISTS rating_history (
+        media_type TEXT NOT NULL,
+        tmdb_id INTEGER NOT NULL,
+        snapshot_date DATE NOT NULL,
+        rating DOUBLE PRECISION,
+        PRIMARY KEY (media_type, tmdb_id, snapshot_date)
+    );
+    CREATE INDEX IF NOT EXISTS rating_history_date_brin ON rating_history
+        USING BRIN (snapshot_date);
+    -- Ratings were first stored as REAL, 7.1 was read back as 7.099999904632568
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'rating_history'
+                AND column_name = 'rating' AND data_type = 'real') THEN
+            ALTER TABLE rating_history
+                ALTER COLUMN rating TYPE DOUBLE PRECISION USING rating::NUMERIC;
+        END IF;
+    END $$;
+    CREATE TABLE IF NOT EXISTS catalogue_events (
+        event_date DATE NOT NULL,
+        media_type TEXT NOT NULL,
+        tmdb_id INTEGER NOT NULL,
+        event TEXT NOT NULL CHECK (event IN ('added', 'removed')),
+        PRIMARY KEY (media_type, tmdb_id, event_date, event)
+    );
+    CREATE INDEX IF NOT EXISTS catalogue_events_date_brin ON catalogue_events
+        USING BRIN (event_date);
+"""
 
 @lru_cache(maxsize=None) # Cache the result of the function
 def get_genres():
@@ -41,68 +103,365 @@ def get_genres():
 
     return genres_data
 
+def format_copy_value(value):
+    """Format a value for the text format of COPY.
+
+    Args:
+        value (Any): Value of a column
+
+    Returns:
+        str: Escaped value, or \\N for NULL
+    """
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+def build_upsert_query(table:str, columns:list, source:str):
+    """Build the INSERT ... ON CONFLICT (tmdb_id) statement merging rows into a table.
+
+    Args:
+        table (str): Target table
+        columns (list): Loaded columns, must contain tmdb_id
+        source (str): Source of the rows ('VALUES %s' or a SELECT)
+
+    Returns:
+        str: The upsert statement, updating the rows whose values changed when
+            POSTGRES_UPDATE_EXISTING is set and keeping them untouched otherwise
+    """
+    column_list = ", ".join(columns)
+    if not POSTGRES_UPDATE_EXISTING:
+        return f"INSERT INTO {table} ({column_list}) {source} ON CONFLICT (tmdb_id) DO NOTHING"
+
+    updated = [column for column in columns if column != 'tmdb_id']
+    assignments = ", ".join(f"{column} = EXCLUDED.{column}" for column in updated)
+    current = ", ".join(f"{table}.{column}" for column in updated)
+    excluded = ", ".join(f"EXCLUDED.{column}" for column in updated)
+    return f"""
+        INSERT INTO {table} ({column_list}) {source}
+        ON CONFLICT (tmdb_id) DO UPDATE SET {assignments}
+        WHERE ({current}) IS DISTINCT FROM ({excluded})
+    """
+
+def copy_rows(cursor, table:str, columns:list, rows):
+    """Stream rows into a table with COPY, one chunk at a time.
+
+    Args:
+        cursor (psycopg2.extensions.cursor): Open cursor
+        table (str): Target table
+        columns (list): Loaded columns
+        rows (Iterable): Tuples of values in the order of columns
+
+    Returns:
+        int: Number of rows copied
+    """
+    column_list = ", ".join(columns)
+    # One COPY per chunk keeps a single chunk in memory
+    copied = 0
+    for chunk in iter_chunks(rows, LOAD_CHUNK_SIZE):
+        buffer = io.StringIO()
+        for row in chunk:
+            buffer.write("\t".join(format_copy_value(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({column_list}) FROM STDIN", buffer)
+        copied += len(chunk)
+    return copied
+
+def copy_upsert(cursor, table:str, columns:list, rows):
+    """Stream rows into a staging table with COPY and merge them with one upsert.
+
+    Args:
+        cursor (psycopg2.extensions.cursor): Open cursor
+        table (str): Target table
+        columns (list): Loaded columns, must contain tmdb_id
+        rows (Iterable): Tuples of values in the order of columns
+
+    Returns:
+        int: Number of rows copied
+    """
+    staging = f"staging_{table}"
+    column_list = ", ".join(columns)
+    cursor.execute(f"""
+        CREATE TEMP TABLE {staging} AS
+        SELECT {column_list} FROM {table} WITH NO DATA
+    """)
+
+    copied = copy_rows(cursor, staging, columns, rows)
+
+    # An upsert cannot touch the same row twice, keep one row per tmdb_id
+    cursor.execute(build_upsert_query(table, columns, f"""
+        SELECT DISTINCT ON (tmdb_id) {column_list} FROM {staging} ORDER BY tmdb_id
+    """))
+    cursor.execute(f"DROP TABLE {staging}")
+    return copied
+
+def paged_upsert(cursor, table:str, columns:list, rows):
+    """Upsert rows with execute_values, one chunk at a time.
+
+    Args:
+        cursor (psycopg2.extensions.cursor): Open cursor
+        table (str): Target table
+        columns (list): Loaded columns, must contain tmdb_id
+        rows (Iterable): Tuples of values in the order of columns
+
+    Returns:
+        int: Number of rows sent
+    """
+    query = build_upsert_query(table, columns, "VALUES %s")
+    id_index = columns.index('tmdb_id')
+    sent = 0
+    for chunk in iter_chunks(rows, LOAD_CHUNK_SIZE):
+        chunk = list({row[id_index]: row for row in chunk}.values())
+        execute_values(cursor, query, chunk, page_size=POSTGRES_PAGE_SIZE)
+        sent += len(chunk)
+    return sent
+
+def bulk_upsert(cursor, table:str, columns:list, read_rows, use_copy:bool = POSTGRES_USE_COPY):
+    """Upsert rows into a table, through COPY when allowed and execute_values paging otherwise.
+
+    Args:
+        cursor (psycopg2.extensions.cursor): Open cursor
+        table (str): Target table
+        columns (list): Loaded columns, must contain tmdb_id
+        read_rows (Callable): Function returning a fresh iterable of rows (tuples of values
+            in the order of columns), called again if COPY fails
+        use_copy (bool, optional): Try COPY first. Defaults to the POSTGRES_USE_COPY setting.
+
+    Returns:
+        tuple: (loaded, copied) number of rows loaded and whether COPY was used
+    """
+    if use_copy:
+        cursor.execute("SAVEPOINT bulk_upsert")
+        try:
+            loaded = copy_upsert(cursor, table, columns, read_rows())
+            cursor.execute("RELEASE SAVEPOINT bulk_upsert")
+            return loaded, True
+        except psycopg2.Error as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT bulk_upsert")
+            LOGGER.warning(
+                f"⚠️ COPY unavailable for {table}, falling back to paged inserts: {e}")
+
+    return paged_upsert(cursor, table, columns, read_rows()), False
+
+def iter_postgres_rows(media:str, genres:dict):
+    """Read the extracted titles of a media type as rows of the Postgres table.
+
+    Args:
+        media (str): Type of media ('movie' or 'tv')
+        genres (dict): Genre names by id for this media type
+
+    Yields:
+        tuple: Values in the order of POSTGRES_TABLES[media] columns
+    """
+    if media == 'movie':
+        title_key, date_key = 'title', 'release_date'
+    else:
+        title_key, date_key = 'name', 'first_air_date'
+    for item in iter_ndjson(data_file(media)):
+        yield (
+            item[title_key],
+            item[date_key] or None,
+            item["vote_average"],
+            ", ".join([genres.get(g, "") for g in item["genre_ids"]]),
+            item["id"],
+            item["original_language"],
+            item["poster_path"]
+        )
+
+def read_links(media:str):
+    """Read the genre ids and origin countries of the extracted titles of a media type.
+
+    Args:
+        media (str): Type of media ('movie' or 'tv')
+
+    Returns:
+        tuple: (genre_links, country_links) lists of (tmdb_id, genre_id) and
+            (tmdb_id, country_code) pairs
+    """
+    genre_links, country_links = [], []
+    for item in iter_ndjson(data_file(media)):
+        genre_links += [(item["id"], genre_id) for genre_id in set(item.get("genre_ids") or [])]
+        # Only series come with their origin countries, the stats enrichment fills the rest
+        country_links += [(item["id"], code) for code in set(item.get("origin_country") or [])]
+    return genre_links, country_links
+
+def stage_links(cursor, staging:str, key_type:str, links:list,
+                use_copy:bool = POSTGRES_USE_COPY):
+    """Create a temporary (tmdb_id, key) table holding the links of the loaded titles,
+    through COPY when allowed and execute_values paging otherwise.
+
+    Args:
+        cursor (psycopg2.extensions.cursor): Open cursor
+        staging (str): Name of the temporary table
+        key_type (str): SQL type of the key column
+        links (list): (tmdb_id, key) pairs
+        use_copy (bool, optional): Try COPY first. Defaults to the POSTGRES_USE_COPY setting.
+
+    Returns:
+        bool: Whether COPY was used
+    """
+    cursor.execute(f"CREATE TEMP TABLE {staging} (tmdb_id INTEGER, key {key_type}) ON COMMIT DROP")
+    if use_copy:
+        # Same fallback as bulk_upsert, a refused COPY must not abort the whole load
+        cursor.execute("SAVEPOINT stage_links")
+        try:
+            copy_rows(cursor, staging, ['tmdb_id', 'key'], links)
+            cursor.execute("RELEASE SAVEPOINT stage_links")
+            return True
+        except psycopg2.Error as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT stage_links")
+            LOGGER.warning(
+                f"⚠️ COPY unavailable for {staging}, falling back to paged inserts: {e}")
+
+    execute_values(cursor, f"INSERT INTO {staging} (tmdb_id, key) VALUES %s", links,
+                page_size=POSTGRES_PAGE_SIZE)
+    return False
+
+def load_links(cursor, table:str, media:str, genres:dict, use_copy:bool = POSTGRES_USE_COPY):
+    """Replace the genre and country links of the loaded titles of a media type.
+
+    Args:
+        cursor (psycopg2.extensions.cursor): Open cursor, in the transaction of the load
+        table (str): Title table, used as media_type of the links
+        media (str): Type of media ('movie' or 'tv')
+        genres (dict): Genre names by id for this media type
+        use_copy (bool, optional): Stage the links with COPY. Defaults to the
+            POSTGRES_USE_COPY setting.
+
+    Returns:
+        tuple: (genre_links, country_links, copied) number of links read and whether
+            COPY was used
+    """
+    genre_links, country_links = read_links(media)
+
+    execute_values(cursor, """
+        INSERT INTO genres (id, name) VALUES %s
+        ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name
+        WHERE genres.name IS DISTINCT FROM EXCLUDED.name
+    """, list(genres.items()))
+
+    use_copy = stage_links(cursor, f"staging_{table}_genres", "INTEGER", genre_links, use_copy)
+    cursor.execute(f"""
+        DELETE FROM media_genre WHERE media_type = %s
+        AND tmdb_id IN (SELECT tmdb_id FROM staging_{table}_genres)
+    """, (table,))
+    # Ids missing from the genre list are skipped, as they are in the genre column
+    cursor.execute(f"""
+        INSERT INTO media_genre (media_type, tmdb_id, genre_id)
+        SELECT DISTINCT %s, s.tmdb_id, s.key FROM staging_{table}_genres s
+        JOIN genres g ON g.id = s.key
+    """, (table,))
+
+    use_copy = stage_links(cursor, f"staging_{table}_countries", "TEXT", country_links, use_copy)
+    cursor.execute(f"""
+        INSERT INTO countries (code) SELECT DISTINCT key FROM staging_{table}_countries
+        ON CONFLICT (code) DO NOTHING
+    """)
+    cursor.execute(f"""
+        DELETE FROM media_country WHERE media_type = %s
+        AND tmdb_id IN (SELECT tmdb_id FROM staging_{table}_countries)
+    """, (table,))
+    cursor.execute(f"""
+        INSERT INTO media_country (media_type, tmdb_id, country_id)
+        SELECT DISTINCT %s, s.tmdb_id, c.id FROM staging_{table}_countries s
+        JOIN countries c ON c.code = s.key
+    """, (table,))
+    return len(genre_links), len(country_links), use_copy
+
+def load_history(cursor, table:str, media:str, manifest:dict,
+                use_copy:bool = POSTGRES_USE_COPY):
+    """Append the changed ratings and the added or removed titles of a media type
+    to the history tables.
+
+    Args:
+        cursor (psycopg2.extensions.cursor): Open cursor, in the transaction of the load
+        table (str): Title table, used as media_type of the history
+        media (str): Type of media ('movie' or 'tv')
+        manifest (dict): Delta manifest of the extraction, None if there is none
+        use_copy (bool, optional): Stage the ratings with COPY, falling back to paged
+            inserts if it is refused. Defaults to the POSTGRES_USE_COPY setting.
+
+    Returns:
+        tuple: (ratings, events) number of rows appended
+    """
+    snapshot_date = manifest['date'] if manifest else date.today().isoformat()
+
+    ratings = [(item["id"], item["vote_average"]) for item in iter_ndjson(data_file(media))]
+    stage_links(cursor, f"staging_{table}_ratings", "DOUBLE PRECISION", ratings, use_copy)
+    # Compared with the last recorded rating of the title, through the primary key
+    cursor.execute(f"""
+        INSERT INTO rating_history (media_type, tmdb_id, snapshot_date, rating)
+        SELECT %(media_type)s, s.tmdb_id, %(date)s, s.key FROM staging_{table}_ratings s
+        WHERE s.key IS DISTINCT FROM (
+            SELECT h.rating FROM rating_history h
+            WHERE h.media_type = %(media_type)s AND h.tmdb_id = s.tmdb_id
+            AND h.snapshot_date <= %(date)s
+            ORDER BY h.snapshot_date DESC LIMIT 1
+        )
+        ON CONFLICT (media_type, tmdb_id, snapshot_date) DO NOTHING
+    """, {'media_type': table, 'date': snapshot_date})
+    rating_rows = cursor.rowcount
+
+    summary = (manifest or {}).get(media, {})
+    events = [(snapshot_date, table, tmdb_id, event)
+            for event in ('added', 'removed') for tmdb_id in summary.get(event, [])]
+    inserted = execute_values(cursor, """
+        INSERT INTO catalogue_events (event_date, media_type, tmdb_id, event) VALUES %s
+        ON CONFLICT (media_type, tmdb_id, event_date, event) DO NOTHING RETURNING 1
+    """, events, page_size=POSTGRES_PAGE_SIZE, fetch=True)
+    return rating_rows, len(inserted)
+
+def bump_catalogue_version(cursor, table:str):
+    """Increment the version of a loaded table, creating the versions table if needed.
+
+    Args:
+        cursor (psycopg2.extensions.cursor): Open cursor, in the transaction of the load
+        table (str): Loaded table
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            version BIGINT NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.execute(f"""
+        INSERT INTO {VERSIONS_TABLE} (table_name, version) VALUES (%s, 1)
+        ON CONFLICT (table_name) DO UPDATE
+        SET version = {VERSIONS_TABLE}.version + 1, updated_at = now()
+    """, (table,))
+
 def load_to_postgres():
     """Load the data into the Postgres database
     """
     LOGGER.info("Launch of the loading of the extracted data into the Postgres database")
 
     genres_data = get_genres() # Get the genres of movies and tv shows
+    manifest = load_manifest()
 
     conn = psycopg2.connect(DATABASE_URL)
     cursor = conn.cursor()
 
+    # Once COPY is refused, the rest of the load stages its rows with paged inserts
+    use_copy = POSTGRES_USE_COPY
     try:
-        # Load movies
-        with open(f'{OUTPUT_DIR}/netflix_movies.json', 'r', encoding='utf-8') as f:
-            movies = json.load(f)
-
-        movies_data = [(
-            movie["title"],
-            movie["release_date"],
-            movie["vote_average"],
-            ", ".join([genres_data['movie'].get(g, "") for g in movie["genre_ids"]]),
-            movie["id"],
-            movie["original_language"],
-            movie["poster_path"]
-            ) for movie in movies]
-
-        cursor.executemany(
-            """
-            INSERT INTO movies (
-                title, release_date, rating, genre, tmdb_id,
-                original_language, poster_path
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (tmdb_id) DO NOTHING
-            """,
-            movies_data
-        )
-        LOGGER.info(f'✅ {len(movies)} movies loaded into the database')
-
-        # Load series
-        with open(f'{OUTPUT_DIR}/netflix_series.json', 'r', encoding='utf-8') as f:
-            series = json.load(f)
-
-        series_data = [(
-            serie["name"],
-            serie["first_air_date"],
-            serie["vote_average"],
-            ", ".join([genres_data['tv'].get(g, "") for g in serie["genre_ids"]]),
-            serie["id"],
-            serie["original_language"],
-            serie["poster_path"]
-            ) for serie in series]
-
-        cursor.executemany(
-            """
-            INSERT INTO series (
-                title, first_air_date, rating, genre, tmdb_id,
-                original_language, poster_path
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (tmdb_id) DO NOTHING
-            """,
-            series_data
-        )
-        LOGGER.info(f'✅ {len(series)} series loaded into the database')
+        cursor.execute(LINK_TABLES_DDL)
+        cursor.execute(HISTORY_TABLES_DDL)
+        for media, (table, columns) in POSTGRES_TABLES.items():
+            loaded, use_copy = bulk_upsert(
+                cursor, table, columns,
+                lambda media=media: iter_postgres_rows(media, genres_data[media]), use_copy)
+            LOGGER.info(f'✅ {loaded} {table} loaded into the database')
+            genre_links, country_links, use_copy = load_links(cursor, table, media,
+                                                            genres_data[media], use_copy)
+            LOGGER.info(f'✅ {genre_links} genre and {country_links} country links '
+                        f'of {table} loaded')
+            ratings, events = load_history(cursor, table, media, manifest, use_copy)
+            LOGGER.info(f'✅ {ratings} rating changes and {events} catalogue events '
+                        f'of {table} recorded')
+            if loaded or events:
+                bump_catalogue_version(cursor, table)
 
         conn.commit()
     except Exception as e:
@@ -114,63 +473,99 @@ def load_to_postgres():
 
     LOGGER.info('✅ Loading complete')
 
+def get_write_concern():
+    """Build the write concern of the MongoDB loads from the configuration.
+
+    Returns:
+        WriteConcern: Write concern with the configured 'w' and 'j' options
+    """
+    w = MONGO_WRITE_CONCERN_W
+    return WriteConcern(w=int(w) if w.isdigit() else w, j=MONGO_WRITE_CONCERN_J)
+
+def build_mongo_operations(chunk:list):
+    """Build the upserts of a chunk of titles.
+
+    Args:
+        chunk (list): TMDB results freshly read from the extracted file
+
+    Returns:
+        list: One UpdateOne per title with an id
+    """
+    operations = []
+    for item in chunk:
+        if "id" not in item:
+            continue
+        item["tmdb_id"] = item["id"] # Items are parsed per chunk, no need to copy them
+        operations.append(UpdateOne({"tmdb_id": item["id"]}, {"$set": item}, upsert=True))
+    return operations
+
+def write_mongo_chunk(collection, operations:list, number:int):
+    """Send the upserts of a chunk and log its throughput.
+
+    Args:
+        collection (pymongo.collection.Collection): Target collection
+        operations (list): Upserts of the chunk
+        number (int): Number of the chunk, for the logs
+
+    Returns:
+        int: Number of documents written
+    """
+    start = time.perf_counter()
+    collection.bulk_write(operations, ordered=False)
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    LOGGER.info(f"📦 {collection.name} chunk {number}: {len(operations)} docs in {elapsed:.2f}s "
+                f"({len(operations) / elapsed:.0f} docs/s)")
+    return len(operations)
+
+def load_mongo_collection(collection, media:str):
+    """Upsert the extracted titles of a media type chunk by chunk, reading and parsing
+    the next chunk while the current one is being written.
+
+    Args:
+        collection (pymongo.collection.Collection): Target collection
+        media (str): Type of media ('movie' or 'tv')
+
+    Returns:
+        int: Number of documents written
+    """
+    # Without this index every upsert filter is a collection scan
+    try:
+        collection.create_index("tmdb_id", unique=True)
+    except OperationFailure as e:
+        LOGGER.warning(f"⚠️ Unique tmdb_id index unavailable on {collection.name}: {e}")
+
+    loaded = 0
+    pending = None
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        chunks = iter_chunks(iter_ndjson(data_file(media)), MONGO_BATCH_SIZE)
+        for number, chunk in enumerate(chunks, start=1):
+            operations = build_mongo_operations(chunk)
+            if pending is not None:
+                loaded += pending.result()
+                pending = None
+            if operations:
+                pending = executor.submit(write_mongo_chunk, collection, operations, number)
+        if pending is not None:
+            loaded += pending.result()
+    return loaded
+
 def load_to_mongo():
     """Load the data into the MongoDB database
     """
     LOGGER.info("🚚 Launch of the loading of the extracted data into the MongoDB database")
 
+    client = MongoClient(MONGO_DB_HOST)
     try:
-        client = MongoClient(MONGO_DB_HOST)
         db = client[MONGO_DB_NAME]
-        collection_movies = db['movies']
-        collection_series = db['series']
-
-        # Load movies
-        with open(f'{OUTPUT_DIR}/netflix_movies.json', 'r', encoding='utf-8') as f:
-            movies = json.load(f)
-        with open(f'{OUTPUT_DIR}/netflix_series.json', 'r', encoding='utf-8') as f:
-            series = json.load(f)
-
-        if movies:
-            try:
-                # Add the tmdb_id field
-                movies_data = [{**movie, "tmdb_id": movie["id"]}
-                            for movie in movies if "id" in movie]
-
-                bulk_operations = [
-                    UpdateOne(
-                        {"tmdb_id": movie["tmdb_id"]},
-                        {"$set": movie},
-                        upsert=True
-                    ) for movie in movies_data
-                ]
-
-                if bulk_operations:
-                    collection_movies.bulk_write(bulk_operations, ordered=False)
-                    LOGGER.info(f'✅ {len(movies)} movies loaded into the database')
-            except Exception as e:
-                LOGGER.error(f"❌ Error during loading: {str(e)}")
-                raise e
-
-        if series:
-            try:
-                series_data = [{**serie, "tmdb_id": serie["id"]}
-                            for serie in series if "id" in serie]
-
-                bulk_operations = [
-                    UpdateOne(
-                        {"tmdb_id": serie["tmdb_id"]},
-                        {"$set": serie},
-                        upsert=True
-                    ) for serie in series_data
-                ]
-
-                if bulk_operations:
-                    collection_series.bulk_write(bulk_operations, ordered=False)
-                    LOGGER.info(f'✅ {len(series)} series loaded into the database')
-            except Exception as e:
-                LOGGER.error(f"❌ Error during loading: {str(e)}")
-                raise e
+        write_concern = get_write_concern()
+
+        for media, collection_name in MONGO_COLLECTIONS.items():
+            collection = db.get_collection(collection_name, write_concern=write_concern)
+            start = time.perf_counter()
+            loaded = load_mongo_collection(collection, media)
+            elapsed = max(time.perf_counter() - start, 1e-6)
+            LOGGER.info(f'✅ {loaded} {collection_name} loaded into the database '
+                        f'({loaded / elapsed:.0f} docs/s)')
     except Exception as e:
         LOGGER.error(f"❌ Error during loading: {str(e)}")
         raise e
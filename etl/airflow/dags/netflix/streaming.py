@@ -0,0 +1,130 @@
+"""
+@author: Joseph A.
+Description: This script reads and writes the newline-delimited JSON files exchanged between
+the extract and load tasks.
+"""
+import os
+import gzip
+import json
+from itertools import islice
+from .config import OUTPUT_COMPRESSION
+
+try:
+    import zstandard
+except ImportError: # zstd is optional, gzip and plain files work without it
+    zstandard = None
+
+# File extension of each compression
+EXTENSIONS = {'none': '.ndjson', 'gzip': '.ndjson.gz', 'zstd': '.ndjson.zst'}
+
+def extension(compression:str = OUTPUT_COMPRESSION):
+    """Get the file extension of a compression.
+
+    Args:
+        compression (str, optional): 'none', 'gzip' or 'zstd'. Defaults to OUTPUT_COMPRESSION.
+
+    Raises:
+        ValueError: If the compression is unknown
+
+    Returns:
+        str: File extension, including the leading dot
+    """
+    if compression not in EXTENSIONS:
+        raise ValueError(f"Unknown compression '{compression}', expected one of {list(EXTENSIONS)}")
+    return EXTENSIONS[compression]
+
+def open_stream(path:str, mode:str = 'r'):
+    """Open a NDJSON file in text mode, compressed according to its extension.
+
+    Args:
+        path (str): Path of the file
+        mode (str, optional): 'r' or 'w'. Defaults to 'r'.
+
+    Raises:
+        ImportError: If the file is zstd compressed and zstandard is not installed
+
+    Returns:
+        TextIO: The opened file
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, f'{mode}t', encoding='utf-8')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise ImportError("zstandard is required to read or write .zst files")
+        return zstandard.open(path, f'{mode}t', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def extension_of(path:str):
+    """Get the compression suffix of a path.
+
+    Args:
+        path (str): Path of the file
+
+    Returns:
+        str: '.gz', '.zst' or an empty string
+    """
+    for suffix in ('.gz', '.zst'):
+        if path.endswith(suffix):
+            return suffix
+    return ''
+
+class NDJSONWriter:
+    """Write records one line at a time to a temporary file, moved in place on close
+    so readers never see a half written file.
+    """
+
+    def __init__(self, path:str):
+        self.path = path
+        self.tmp_path = f'{path}.tmp{extension_of(path)}'
+        self.file = open_stream(self.tmp_path, 'w')
+        self.count = 0
+
+    def write(self, item:dict):
+        """Append a record to the file.
+
+        Args:
+            item (dict): JSON serializable record
+        """
+        self.file.write(json.dumps(item, ensure_ascii=False))
+        self.file.write('\n')
+        self.count += 1
+
+    def close(self):
+        """Close the file and move it in place.
+        """
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Close and delete the temporary file, leaving the previous file untouched.
+        """
+        self.file.close()
+        os.remove(self.tmp_path)
+
+def iter_ndjson(path:str):
+    """Iterate over the records of a NDJSON file without loading it in memory.
+
+    Args:
+        path (str): Path of the file
+
+    Yields:
+        dict: One record per non-empty line
+    """
+    with open_stream(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def iter_chunks(iterable, size:int):
+    """Group an iterable in lists of a fixed size.
+
+    Args:
+        iterable (Iterable): Items to group
+        size (int): Number of items per chunk, the last chunk may be smaller
+
+    Yields:
+        list: The next chunk
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -0,0 +1,144 @@
+"""
+@author: Joseph A.
+Description: This script contains the asynchronous HTTP client used to query the TMDB API.
+"""
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import aiohttp
+from .config import (TMDB_API_KEY, TMDB_MAX_CONCURRENCY, TMDB_RATE_LIMIT, TMDB_MAX_RETRIES,
+                    TMDB_TIMEOUT, LOGGER)
+
+def parse_retry_after(value, attempt:int):
+    """Convert a Retry-After header into a delay in seconds.
+
+    Args:
+        value (str): Value of the Retry-After header (seconds or HTTP date), may be None
+        attempt (int): Number of the current attempt, used for the exponential fallback
+
+    Returns:
+        float: Number of seconds to wait before retrying
+    """
+    if value:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            pass
+    return float(2 ** attempt)
+
+class HostRateLimiter:
+    """Space out the requests sent to a single host and pause it when the host asks to.
+    """
+
+    def __init__(self, rate:float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        """Wait for the next free request slot of the host.
+        """
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        await asyncio.sleep(slot - now)
+
+    def pause(self, delay:float):
+        """Hold every request to the host for the given delay.
+
+        Args:
+            delay (float): Number of seconds to wait
+        """
+        self.next_slot = max(self.next_slot, time.monotonic() + delay)
+
+class TMDBClient:
+    """Shared, connection-pooled session to the TMDB API with bounded concurrency
+    and per-host rate limiting.
+    """
+
+    def __init__(self, max_concurrency:int = TMDB_MAX_CONCURRENCY,
+                rate_limit:float = TMDB_RATE_LIMIT, max_retries:int = TMDB_MAX_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.rate_limit = rate_limit
+        self.max_retries = max_retries
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.limiters = {}
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=TMDB_TIMEOUT)
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    def get_limiter(self, url:str):
+        """Get the rate limiter of the host of an URL.
+
+        Args:
+            url (str): URL of the request
+
+        Returns:
+            HostRateLimiter: The rate limiter shared by every request to this host
+        """
+        host = urlsplit(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = HostRateLimiter(self.rate_limit)
+        return self.limiters[host]
+
+    async def get_json(self, url:str, params:dict = None):
+        """Send a GET request and decode the JSON body, retrying when the API is throttling,
+        failing or unreachable.
+
+        Args:
+            url (str): URL of the request
+            params (dict, optional): Query parameters, the API key is added automatically
+
+        Raises:
+            ValueError: If the API answers with an unexpected status code
+            aiohttp.ClientError: If the request still fails after the last retry
+            asyncio.TimeoutError: If the request still times out after the last retry
+
+        Returns:
+            dict: The decoded JSON body
+        """
+        # aiohttp refuses None values where requests silently dropped them
+        params = {key: value for key, value in {'api_key': TMDB_API_KEY, **(params or {})}.items()
+                if value is not None}
+        limiter = self.get_limiter(url)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.semaphore:
+                    await limiter.wait()
+                    async with self.session.get(url, params=params) as response:
+                        retryable = response.status == 429 or response.status >= 500
+                        if retryable and attempt < self.max_retries:
+                            delay = parse_retry_after(response.headers.get('Retry-After'),
+                                                    attempt)
+                            limiter.pause(delay)
+                            LOGGER.warning(
+                                f"⏳ {response.status} from {url}, retrying in {delay:.1f}s")
+                            continue
+                        if response.status != 200:
+                            raise ValueError(f"Unexpected status {response.status} from {url}")
+                        return await response.json()
+            # Dropped connections and timeouts, retried with the same backoff
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = parse_retry_after(None, attempt)
+                LOGGER.warning(f"⏳ {type(e).__name__} from {url}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        raise ValueError(f"Too many retries for {url}")
@@ -0,0 +1,83 @@
+-- @author: Joseph A.
+-- Normalized genres and origin countries of the titles. Run by the Airflow loader, which
+-- fills media_genre and media_country, and by the in-database statistics engine, whose
+-- enrichment step fills media_country.
+
+-- media_country first stored the code, alpha-3 and name of the country in each row. Its links
+-- are set aside and the table dropped, with the statistics view built on it.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'media_country'
+            AND column_name = 'country_code') THEN
+        CREATE TEMPORARY TABLE media_country_v1 AS
+            SELECT media_type, tmdb_id, country_code, country_code_3, country_name
+            FROM media_country;
+        DROP MATERIALIZED VIEW IF EXISTS stats_views;
+        DROP TABLE media_country;
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS genres (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS countries (
+    id SERIAL PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE,
+    code_3 TEXT,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS media_genre (
+    media_type TEXT NOT NULL,
+    tmdb_id INTEGER NOT NULL,
+    genre_id INTEGER NOT NULL REFERENCES genres (id),
+    PRIMARY KEY (media_type, tmdb_id, genre_id)
+);
+CREATE INDEX IF NOT EXISTS media_genre_genre_idx ON media_genre (genre_id, media_type);
+CREATE TABLE IF NOT EXISTS media_country (
+    media_type TEXT NOT NULL,
+    tmdb_id INTEGER NOT NULL,
+    country_id INTEGER NOT NULL REFERENCES countries (id),
+    PRIMARY KEY (media_type, tmdb_id, country_id)
+);
+CREATE INDEX IF NOT EXISTS media_country_country_idx ON media_country (country_id, media_type);
+
+-- Links set aside by the migration above, moved to the new layout
+DO $$
+BEGIN
+    IF to_regclass('pg_temp.media_country_v1') IS NOT NULL THEN
+        INSERT INTO countries (code, code_3, name)
+            SELECT DISTINCT ON (country_code) country_code, country_code_3, country_name
+            FROM media_country_v1
+        ON CONFLICT (code) DO NOTHING;
+        INSERT INTO media_country (media_type, tmdb_id, country_id)
+            SELECT DISTINCT v.media_type, v.tmdb_id, c.id
+            FROM media_country_v1 v JOIN countries c ON c.code = v.country_code
+        ON CONFLICT DO NOTHING;
+        DROP TABLE media_country_v1;
+    END IF;
+END $$;
+
+-- Titles loaded before the junction tables only get links when they change again. Their
+-- genres are backfilled once from the genre column of their table, as soon as the loader
+-- filled the genre list, and the comment of media_genre records that it was done. The
+-- origin countries need no backfill, the enrichment step replaces media_country in full.
+DO $$
+BEGIN
+    IF obj_description('media_genre'::regclass, 'pg_class') IS NULL
+            AND to_regclass('movies') IS NOT NULL AND to_regclass('series') IS NOT NULL
+            AND EXISTS (SELECT 1 FROM genres) THEN
+        INSERT INTO media_genre (media_type, tmdb_id, genre_id)
+            SELECT DISTINCT t.media_type, t.tmdb_id, g.id
+            FROM (SELECT 'movies' AS media_type, tmdb_id, genre FROM movies
+                UNION ALL SELECT 'series', tmdb_id, genre FROM series) t
+            CROSS JOIN LATERAL unnest(string_to_array(t.genre, ',')) AS n (name)
+            JOIN (SELECT name, min(id) AS id FROM genres GROUP BY name) g
+                ON g.name = trim(n.name)
+            WHERE NOT EXISTS (SELECT 1 FROM media_genre m
+                            WHERE m.media_type = t.media_type AND m.tmdb_id = t.tmdb_id)
+        ON CONFLICT DO NOTHING;
+        COMMENT ON TABLE media_genre IS 'Backfilled from the genre columns';
+    END IF;
+END $$;
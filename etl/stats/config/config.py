@@ -18,3 +18,32 @@ engine = create_engine(POSTGRES_URL)
 # TMDB API
 TMDB_API_KEY = os.getenv('TMDB_API_KEY')
 TMDB_BASE_URL = 'https://api.themoviedb.org/3'
+
+# Enrichment - parallel TMDB detail calls backed by an on-disk cache
+ENRICH_MAX_WORKERS = int(os.getenv('ENRICH_MAX_WORKERS', '16'))
+ENRICH_CACHE_PATH = os.path.join(ETL_DIR, 'stats', 'db', 'cache', 'origin_country.json')
+ENRICH_CACHE_TTL_DAYS = int(os.getenv('ENRICH_CACHE_TTL_DAYS', '30'))
+
+# DDL of the genre and country tables, shared with the Airflow loader
+LINK_TABLES_SQL = os.path.join(ETL_DIR, 'sql', 'link_tables.sql')
+
+# Statistics engine - 'pandas' computes them in Python, 'sql' in a PostgreSQL materialized view
+STATS_ENGINE = os.getenv('STATS_ENGINE', 'pandas')
+
+# Checkpoint of the enriched media between extraction and analysis: 'none', 'parquet' or 'feather'
+# (both require the parquet extra), lets stats.py run again without extracting the media
+STATS_CHECKPOINT = os.getenv('STATS_CHECKPOINT', 'none').lower()
+CHECKPOINT_PATH = os.path.join(ETL_DIR, 'stats', 'db', 'clean', 'latest')
+
+# Daily snapshots of the enriched media: 'csv' files or a 'parquet' store partitioned by
+# snapshot date and media type (requires the parquet extra)
+STATS_SNAPSHOTS = os.getenv('STATS_SNAPSHOTS', 'csv').lower()
+SNAPSHOT_PATH = os.path.join(ETL_DIR, 'stats', 'db', 'snapshots')
+
+# Incremental statistics - the titles changed by the last extraction are applied to a mergeable
+# state, the statistics are recomputed over the whole catalogue every STATS_FULL_RECOMPUTE_DAYS.
+# With a checkpoint (STATS_CHECKPOINT), eda.py only extracts and enriches these titles too
+STATS_INCREMENTAL = os.getenv('STATS_INCREMENTAL', 'false').lower() == 'true'
+STATS_FULL_RECOMPUTE_DAYS = int(os.getenv('STATS_FULL_RECOMPUTE_DAYS', '7'))
+STATS_STATE_PATH = os.path.join(ETL_DIR, 'stats', 'db', 'state', 'stats_state.json')
+MANIFEST_FILE = os.path.join(ETL_DIR, 'tmdb_data', 'delta_manifest.json')
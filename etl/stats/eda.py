@@ -1,51 +1,143 @@
 """
 @author: Joseph A.
-Script for extracting media data from database, enriching it with country information, 
+Script for extracting media data from database, enriching it with country information,
 and saving both daily and latest snapshots.
 """
 import os
 from datetime import datetime
 import pandas as pd
 from utils.enrich import enrich_dataframe
-from config.config import engine
-
-# pylint: disable=C0103:invalid-name
+from utils.save_data import save_media_countries
+from utils.checkpoint import save_checkpoint, load_checkpoint, checkpoint_file
+from utils.snapshots import write_snapshot
+from config.config import engine, STATS_ENGINE, STATS_SNAPSHOTS
 
 # Database extraction queries
 QUERY_MOVIE = 'SELECT * FROM movies;'
 QUERY_SERIE = 'SELECT * FROM series;'
+QUERY_MOVIE_IDS = 'SELECT * FROM movies WHERE tmdb_id = ANY(%(ids)s);'
+QUERY_SERIE_IDS = 'SELECT * FROM series WHERE tmdb_id = ANY(%(ids)s);'
+
+def extract_media(movie_ids:list = None, serie_ids:list = None):
+    """Read the movies and TV series from PostgreSQL.
+
+    Args:
+        movie_ids (list, optional): Only read these movies. Defaults to None, every movie.
+        serie_ids (list, optional): Only read these TV series. Defaults to None, every serie.
+
+    Returns:
+        tuple: (df_movies, df_series), series with their first air date as 'release_date'
+    """
+    if movie_ids is None:
+        df_movies = pd.read_sql_query(QUERY_MOVIE, engine)
+    else:
+        df_movies = pd.read_sql_query(QUERY_MOVIE_IDS, engine, params={'ids': list(movie_ids)})
+    if serie_ids is None:
+        df_series = pd.read_sql_query(QUERY_SERIE, engine)
+    else:
+        df_series = pd.read_sql_query(QUERY_SERIE_IDS, engine, params={'ids': list(serie_ids)})
+
+    # Standardize column names
+    df_series = df_series.rename(columns={'first_air_date': 'release_date'})
+    return df_movies, df_series
+
+def enrich_media(df_movies:pd.DataFrame, df_series:pd.DataFrame):
+    """Enrich movies and TV series with their origin countries.
+
+    Args:
+        df_movies (pd.DataFrame): DataFrame containing movie data
+        df_series (pd.DataFrame): DataFrame containing TV series data
+
+    Returns:
+        tuple: (df_movies, df_series) with the country columns added
+    """
+    df_series = enrich_dataframe(df_series, 'tv')
+    print("") # Visual separator
+    df_movies = enrich_dataframe(df_movies, 'movie')
+    return df_movies, df_series
+
+def patch_media(tmdb_ids:dict, since:str):
+    """Refresh the checkpointed media with the titles changed by the last extraction. Only
+    these titles are extracted and enriched, the removed ones are dropped.
+
+    Args:
+        tmdb_ids (dict): tmdb_ids of the added, changed and removed titles by media type
+        since (str): Time of the extraction the checkpoint must have been written after
+
+    Returns:
+        tuple: (df_movies, df_series) enriched, None if there is no checkpoint written
+            since that extraction
+    """
+    checkpoint = load_checkpoint(('movie', 'serie'))
+    if checkpoint is None or since is None:
+        return None
+    written = min(os.path.getmtime(checkpoint_file(name)) for name in checkpoint)
+    if datetime.fromtimestamp(written) < datetime.fromisoformat(since):
+        return None
+
+    frames = {'movies': checkpoint['movie'], 'series': checkpoint['serie']}
+    changed = dict(zip(('movies', 'series'),
+                    enrich_media(*extract_media(tmdb_ids['movies'], tmdb_ids['series']))))
+    for media_type, df in frames.items():
+        df = df[~df['tmdb_id'].isin(tmdb_ids[media_type])]
+        if not changed[media_type].empty:
+            df = pd.concat([df, changed[media_type]], ignore_index=True)
+        frames[media_type] = df.reset_index(drop=True)
+        print(f"{media_type}: {len(tmdb_ids[media_type])} changed titles refreshed")
+    return frames['movies'], frames['series']
+
+def save_snapshots(df_movies:pd.DataFrame, df_series:pd.DataFrame):
+    """Save the daily snapshots (CSV files or the Parquet store) and the checkpoint
+    of the latest media.
 
-data_movie = pd.read_sql_query(QUERY_MOVIE, engine)
-data_serie = pd.read_sql_query(QUERY_SERIE, engine)
+    Args:
+        df_movies (pd.DataFrame): Enriched movie data
+        df_series (pd.DataFrame): Enriched TV series data
+    """
+    if STATS_SNAPSHOTS == 'parquet':
+        write_snapshot(df_movies, 'movies')
+        write_snapshot(df_series, 'series')
+    else:
+        # Setup paths and filenames for saving data
+        current_year = datetime.now().strftime("%Y")
+        current_month = datetime.now().strftime("%m")
+        current_date = datetime.now().strftime("%d_%m_%y")
+        dir_name = f"{current_month}_{current_year}"
 
-# Standardize column names
-data_serie = data_serie.rename(columns={'first_air_date': 'release_date'})
+        db_path = os.path.join('db', 'clean', current_year, dir_name)
+        os.makedirs(db_path, exist_ok=True)
 
-# Create copies for processing
-df_series = data_serie.copy()
-df_movies = data_movie.copy()
+        # Save daily snapshots
+        df_movies.to_csv(f"{db_path}/movie_{current_date}.csv", index=False)
+        df_series.to_csv(f"{db_path}/serie_{current_date}.csv", index=False)
 
-# Enrich data with country information
-df_series = enrich_dataframe(df_series, 'tv')
-print("") # Visual separator
-df_movies = enrich_dataframe(df_movies, 'movie')
+    # Latest versions, only needed to run stats.py on its own
+    save_checkpoint({'movie': df_movies, 'serie': df_series})
 
-# Setup paths and filenames for saving data
-current_year = datetime.now().strftime("%Y")
-current_month = datetime.now().strftime("%m")
-current_date = datetime.now().strftime("%d_%m_%y")
-dir_name = f"{current_month}_{current_year}"
+def run():
+    """Extract, enrich and save the media. When the statistics are updated incrementally,
+    only the titles changed by the last extraction are extracted, over the checkpoint.
 
-# Define storage paths
-db_path = os.path.join('db', 'clean', current_year, dir_name)
-latest_path = os.path.join('db', 'clean', 'latest')
+    Returns:
+        tuple: (df_movies, df_series) enriched, passed on to the statistics
+    """
+    media = None
+    if STATS_ENGINE == 'pandas':
+        # pylint: disable=C0415:import-outside-toplevel
+        from stats import pending_delta
+        delta = pending_delta()
+        if delta is not None:
+            media = patch_media(*delta)
+    if media is None:
+        media = enrich_media(*extract_media())
+    df_movies, df_series = media
+    save_snapshots(df_movies, df_series)
 
-# Create storage directories
-os.makedirs(db_path, exist_ok=True)
-os.makedirs(latest_path, exist_ok=True)
+    # The in-database engine reads the origin countries from PostgreSQL
+    if STATS_ENGINE == 'sql':
+        save_media_countries(df_movies, 'movies')
+        save_media_countries(df_series, 'series')
+    return df_movies, df_series
 
-# Save daily snapshots and latest versions
-df_movies.to_csv(f"{db_path}/movie_{current_date}.csv", index=False)
-df_series.to_csv(f"{db_path}/serie_{current_date}.csv", index=False)
-df_movies.to_csv(f"{latest_path}/movie_latest.csv", index=False)
-df_series.to_csv(f"{latest_path}/serie_latest.csv", index=False)
+if __name__ == "__main__":
+    run()
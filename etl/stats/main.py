@@ -1,13 +1,16 @@
 """
 @author: Joseph A.
-Description: Main orchestration script that runs data extraction (eda.py) and analysis (stats.py) 
-while managing logging and error handling.
+Description: Main orchestration script that runs data extraction (eda.py) and analysis (stats.py)
+in a single process, passing the DataFrames in memory, while managing logging and error handling.
 """
 import os
-import subprocess
 import sys
 import logging
 from datetime import datetime
+from config.config import STATS_ENGINE
+import eda
+import stats
+import views
 
 def setup_logging():
     """Configure logging to output both to console and file.
@@ -21,25 +24,25 @@ def setup_logging():
         ]
     )
 
-def run_script(script_name:str):
-    """Execute a Python script and handle potential errors.
+def run_stage(stage_name:str, stage, *args):
+    """Execute a pipeline stage and handle potential errors.
 
     Args:
-        script_name (str): Name of the Python script to execute
+        stage_name (str): Name of the stage, for logging
+        stage (Callable): Stage function
+        *args (Any): Arguments of the stage function
 
     Returns:
-        bool: True if script execution was successful, False otherwise
+        tuple: (success, result) where success is True if the stage completed
     """
     try:
-        logging.info("Starting %s", script_name)
-        subprocess.run([sys.executable, script_name], check=True, capture_output=True, text=True)
-        logging.info("Execution of %s completed successfully", script_name)
-        return True
-    except subprocess.CalledProcessError as e:
-        logging.error("Error when executing %s: %s", script_name, e)
-        logging.error("Stdout %s", e.stdout)
-        logging.error("Stderr %s", e.stderr)
-        return False
+        logging.info("Starting %s", stage_name)
+        result = stage(*args)
+        logging.info("Execution of %s completed successfully", stage_name)
+        return True, result
+    except Exception: # pylint: disable=W0718:broad-exception-caught
+        logging.exception("Error when executing %s", stage_name)
+        return False, None
 
 def main():
     """Main function orchestrating the data pipeline.
@@ -52,12 +55,17 @@ def main():
     logging.info("Start of data update and analysis process")
 
     # Execute data extraction
-    if not run_script('eda.py'):
+    success, media = run_stage('eda', eda.run)
+    if not success:
         logging.error("Data update failed. Process stopped.")
         sys.exit(1)
 
-    # Execute data analysis
-    if not run_script("stats.py"):
+    # Execute data analysis, in Python on the extracted DataFrames or in PostgreSQL
+    if STATS_ENGINE == 'sql':
+        success, _ = run_stage('views', views.run)
+    else:
+        success, _ = run_stage('stats', stats.run, *media)
+    if not success:
         logging.error("Failed data analysis.")
         sys.exit(1)
 
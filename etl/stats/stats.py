@@ -4,12 +4,31 @@ Description: Script for analyzing movies and TV series data, generating statisti
 and ratings, and saving them in JSON format both as daily snapshots and latest versions.
 """
 import os
+import json
 from datetime import datetime
 import pandas as pd
 from utils.data_processing import count_split_data, explode_split_data
-from utils.save_data import save_json_data, save_to_postgres
+from utils.save_data import build_payload, write_json, save_stats_to_postgres
+from utils.checkpoint import load_checkpoint
+from utils.incremental_stats import StatsState, stats_match
+from config.config import STATS_INCREMENTAL, STATS_STATE_PATH, MANIFEST_FILE
 
-# pylint: disable=C0103:invalid-name
+# Saved file name, stat_type and media_type in PostgreSQL, and data type of each statistic
+STATS = [
+    ('country_movies_distribution', 'country_distribution', 'movies', 'distribution'),
+    ('country_series_distribution', 'country_distribution', 'series', 'distribution'),
+    ('genres_movies_distribution', 'genre_distribution', 'movies', 'distribution'),
+    ('genres_series_distribution', 'genre_distribution', 'series', 'distribution'),
+    ('yearly_counts_movies', 'yearly_distribution', 'movies', 'distribution'),
+    ('yearly_counts_series', 'yearly_distribution', 'series', 'distribution'),
+    ('country_avg_ratings_movies', 'country_avg_ratings', 'movies', 'ratings'),
+    ('country_avg_ratings_series', 'country_avg_ratings', 'series', 'ratings'),
+    ('genres_avg_ratings_movies', 'genre_avg_ratings', 'movies', 'ratings'),
+    ('genres_avg_ratings_series', 'genre_avg_ratings', 'series', 'ratings'),
+]
+
+# Media type of the manifest and of the statistics
+MANIFEST_MEDIA = {'movie': 'movies', 'tv': 'series'}
 
 def get_distribution(df_series:pd.DataFrame, df_movies:pd.DataFrame, column_name:str):
     """Get distribution counts for a specific column across movies and TV series.
@@ -51,8 +70,9 @@ def year_distribution(df_series:pd.DataFrame, df_movies:pd.DataFrame, column_nam
         tuple: (movie_year_counts, series_year_counts) 
         where each is a pd.Series of yearly counts
     """
-    y_m_d = df_movies[column_name].value_counts().sort_index()
-    y_s_d = df_series[column_name].value_counts().sort_index()
+    # Years are float when a release date is missing, keys are kept integer (2020, not 2020.0)
+    y_m_d = df_movies[column_name].value_counts().sort_index().rename(index=int)
+    y_s_d = df_series[column_name].value_counts().sort_index().rename(index=int)
     return y_m_d, y_s_d
 
 def get_ratings(df, column_name:str):
@@ -90,88 +110,221 @@ def get_avg_ratings(df_series:pd.DataFrame, df_movies:pd.DataFrame, column_name:
 
     return m_a_r, s_a_r
 
-# Load latest data
-base_path = os.path.join('db', 'clean', 'latest')
-movie_filename = f"{base_path}/movie_latest.csv"
-serie_filename = f"{base_path}/serie_latest.csv"
-
-df_movie = pd.read_csv(movie_filename)
-df_tv = pd.read_csv(serie_filename)
-
-# Create working copies and add year data
-df_movie_copy = df_movie.copy()
-df_tv_copy = df_tv.copy()
-
-df_movie_copy = get_year(df_movie_copy)
-df_tv_copy = get_year(df_tv_copy)
-
-# Generate distributions and ratings
-# Distribution of media by country
-country_movies_distribution, country_series_distribution = get_distribution(df_tv, df_movie,
-                                                                            'country_code_3')
-# Analysis of media genres
-genres_movies_distribution, genres_series_distribution = get_distribution(df_tv, df_movie, 'genre')
-# Media releases over time
-yearly_counts_movies, yearly_counts_series = year_distribution(df_tv_copy, df_movie_copy, 'year')
-# Average score by country
-country_avg_ratings_movies, country_avg_ratings_series = get_avg_ratings(df_tv_copy, df_movie_copy,
-                                                                        'country_name')
-# Average score by genres
-genres_avg_ratings_movies, genres_avg_ratings_series = get_avg_ratings(df_tv_copy, df_movie_copy,
-                                                                    'genre')
-
-# Setup paths for saving data
-base_path = os.path.join("db", "api")
-current_year = datetime.now().strftime("%Y")
-current_month = datetime.now().strftime("%m")
-current_date = datetime.now().strftime("%d_%m_%y")
-dir_name = f"{current_month}_{current_year}"
-
-db_path = os.path.join(base_path, current_year, dir_name)
-latest_path = os.path.join(base_path, 'latest')
-
-# Save daily snapshots
-save_json_data(country_movies_distribution, f"country_movies_distribution_{current_date}", db_path)
-save_json_data(country_series_distribution, f"country_series_distribution_{current_date}", db_path)
-save_json_data(genres_movies_distribution, f"genres_movies_distribution_{current_date}", db_path)
-save_json_data(genres_series_distribution, f"genres_series_distribution_{current_date}", db_path)
-save_json_data(yearly_counts_movies, f"yearly_counts_movies_{current_date}", db_path)
-save_json_data(yearly_counts_series, f"yearly_counts_series_{current_date}", db_path)
-save_json_data(country_avg_ratings_movies, f"country_avg_ratings_movies_{current_date}",
-            db_path, 'ratings')
-save_json_data(country_avg_ratings_series, f"country_avg_ratings_series_{current_date}",
-            db_path, 'ratings')
-save_json_data(genres_avg_ratings_movies, f"genres_avg_ratings_movies_{current_date}",
-            db_path, 'ratings')
-save_json_data(genres_avg_ratings_series, f"genres_avg_ratings_series_{current_date}",
-            db_path, 'ratings')
-
-# Save latest versions
-save_json_data(country_movies_distribution, "country_movies_distribution_latest", latest_path)
-save_json_data(country_series_distribution, "country_series_distribution_latest", latest_path)
-save_json_data(genres_movies_distribution, "genres_movies_distribution_latest", latest_path)
-save_json_data(genres_series_distribution, "genres_series_distribution_latest", latest_path)
-save_json_data(yearly_counts_movies, "yearly_counts_movies_latest", latest_path)
-save_json_data(yearly_counts_series, "yearly_counts_series_latest", latest_path)
-save_json_data(country_avg_ratings_movies, "country_avg_ratings_movies_latest",
-            latest_path, 'ratings')
-save_json_data(country_avg_ratings_series, "country_avg_ratings_series_latest",
-            latest_path, 'ratings')
-save_json_data(genres_avg_ratings_movies, "genres_avg_ratings_movies_latest",
-            latest_path, 'ratings')
-save_json_data(genres_avg_ratings_series, "genres_avg_ratings_series_latest",
-            latest_path, 'ratings')
-
-# Save to PostgreSQL
-print("Saving statistics to PostgreSQL...")
-save_to_postgres(country_movies_distribution, 'country_distribution', 'movies')
-save_to_postgres(country_series_distribution, 'country_distribution', 'series')
-save_to_postgres(genres_movies_distribution, 'genre_distribution', 'movies')
-save_to_postgres(genres_series_distribution, 'genre_distribution', 'series')
-save_to_postgres(yearly_counts_movies, 'yearly_distribution', 'movies')
-save_to_postgres(yearly_counts_series, 'yearly_distribution', 'series')
-save_to_postgres(country_avg_ratings_movies, 'country_avg_ratings', 'movies', 'ratings')
-save_to_postgres(country_avg_ratings_series, 'country_avg_ratings', 'series', 'ratings')
-save_to_postgres(genres_avg_ratings_movies, 'genre_avg_ratings', 'movies', 'ratings')
-save_to_postgres(genres_avg_ratings_series, 'genre_avg_ratings', 'series', 'ratings')
-print("Statistics saved to PostgreSQL successfully!")
+def compute_stats(df_movies:pd.DataFrame, df_series:pd.DataFrame):
+    """Compute the ten statistics of the movies and TV series.
+
+    Args:
+        df_movies (pd.DataFrame): Enriched movie data, a 'year' column is added in place
+        df_series (pd.DataFrame): Enriched TV series data, a 'year' column is added in place
+
+    Returns:
+        list: (name, stat_type, media_type, data_type, data) of each statistic
+    """
+    # Add year data, in place so the split columns are cached once per DataFrame
+    df_movies = get_year(df_movies)
+    df_series = get_year(df_series)
+
+    # Distribution of media by country
+    country_movies, country_series = get_distribution(df_series, df_movies, 'country_code_3')
+    # Analysis of media genres
+    genres_movies, genres_series = get_distribution(df_series, df_movies, 'genre')
+    # Media releases over time
+    yearly_movies, yearly_series = year_distribution(df_series, df_movies, 'year')
+    # Average score by country
+    country_ratings_movies, country_ratings_series = get_avg_ratings(df_series, df_movies,
+                                                                    'country_name')
+    # Average score by genres
+    genres_ratings_movies, genres_ratings_series = get_avg_ratings(df_series, df_movies, 'genre')
+
+    return label_stats({
+        ('country_distribution', 'movies'): country_movies,
+        ('country_distribution', 'series'): country_series,
+        ('genre_distribution', 'movies'): genres_movies,
+        ('genre_distribution', 'series'): genres_series,
+        ('yearly_distribution', 'movies'): yearly_movies,
+        ('yearly_distribution', 'series'): yearly_series,
+        ('country_avg_ratings', 'movies'): country_ratings_movies,
+        ('country_avg_ratings', 'series'): country_ratings_series,
+        ('genre_avg_ratings', 'movies'): genres_ratings_movies,
+        ('genre_avg_ratings', 'series'): genres_ratings_series,
+    })
+
+def label_stats(results:dict):
+    """Attach the file name and data type of each statistic.
+
+    Args:
+        results (dict): pd.Series or pd.DataFrame by (stat_type, media_type)
+
+    Returns:
+        list: (name, stat_type, media_type, data_type, data) of each statistic
+    """
+    return [(name, stat_type, media_type, data_type, results[(stat_type, media_type)])
+            for name, stat_type, media_type, data_type in STATS]
+
+def save_stats(stats:list):
+    """Save the statistics as daily and latest JSON files and to PostgreSQL.
+
+    Args:
+        stats (list): (name, stat_type, media_type, data_type, data) of each statistic
+    """
+    # Setup paths for saving data
+    base_path = os.path.join("db", "api")
+    current_year = datetime.now().strftime("%Y")
+    current_month = datetime.now().strftime("%m")
+    current_date = datetime.now().strftime("%d_%m_%y")
+    dir_name = f"{current_month}_{current_year}"
+
+    db_path = os.path.join(base_path, current_year, dir_name)
+    latest_path = os.path.join(base_path, 'latest')
+
+    # JSON documents built once, shared by the files and PostgreSQL
+    payloads = [(name, stat_type, media_type, build_payload(data, data_type))
+                for name, stat_type, media_type, data_type, data in stats]
+
+    # Save daily snapshots and latest versions
+    for name, _, _, payload in payloads:
+        write_json(payload, f"{name}_{current_date}", db_path)
+        write_json(payload, f"{name}_latest", latest_path)
+
+    # Save to PostgreSQL, every statistic in one statement and transaction
+    print("Saving statistics to PostgreSQL...")
+    save_stats_to_postgres([(stat_type, media_type, payload)
+                            for _, stat_type, media_type, payload in payloads])
+    print("Statistics saved to PostgreSQL successfully!")
+
+def load_media():
+    """Load the enriched media from the checkpoint, or extract them again without one.
+
+    Returns:
+        tuple: (df_movies, df_series)
+    """
+    media = load_checkpoint(('movie', 'serie'))
+    if media is not None:
+        return media['movie'], media['serie']
+
+    print("No checkpoint of the media, extracting them again...")
+    from eda import extract_media, enrich_media # pylint: disable=C0415:import-outside-toplevel
+    return enrich_media(*extract_media())
+
+def load_manifest():
+    """Load the delta manifest of the last extraction.
+
+    Returns:
+        dict: Added, changed and removed tmdb_ids by media type, None if there is none
+    """
+    if not os.path.exists(MANIFEST_FILE):
+        return None
+    with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def delta_ids(manifest:dict):
+    """Get the tmdb_ids of the titles added, changed or removed by an extraction.
+
+    Args:
+        manifest (dict): Delta manifest of the extraction
+
+    Returns:
+        dict: Sorted tmdb_ids by media type
+    """
+    return {MANIFEST_MEDIA[media]: sorted({tmdb_id for event in ('added', 'changed', 'removed')
+                                        for tmdb_id in manifest.get(media, {}).get(event, [])})
+            for media in MANIFEST_MEDIA}
+
+def pending_delta():
+    """Get the titles the next incremental update applies, so that eda.py only extracts them.
+
+    Returns:
+        tuple: (tmdb_ids by media type, time of the extraction the state was last updated
+            from), None if the statistics are recomputed over the whole catalogue
+    """
+    if not STATS_INCREMENTAL:
+        return None
+    manifest = load_manifest()
+    if StatsState(STATS_STATE_PATH).full_recompute_reason(manifest) is not None:
+        return None
+    return delta_ids(manifest), manifest['previous_extracted_at']
+
+def load_delta(manifest:dict, df_movies:pd.DataFrame = None, df_series:pd.DataFrame = None):
+    """Get the current data of the titles changed by the last extraction.
+
+    Args:
+        manifest (dict): Delta manifest of the extraction
+        df_movies (pd.DataFrame, optional): Enriched movie data the rows are taken from.
+            Defaults to None, the titles are extracted and enriched.
+        df_series (pd.DataFrame, optional): Enriched TV series data the rows are taken from.
+            Defaults to None, the titles are extracted and enriched.
+
+    Returns:
+        dict: (tmdb_ids, df) by media type
+    """
+    tmdb_ids = delta_ids(manifest)
+    if df_movies is None or df_series is None:
+        # pylint: disable=C0415:import-outside-toplevel
+        from eda import extract_media, enrich_media
+        df_movies, df_series = enrich_media(*extract_media(tmdb_ids['movies'],
+                                                        tmdb_ids['series']))
+    frames = {'movies': df_movies, 'series': df_series}
+    return {media_type: (ids, frames[media_type][frames[media_type]['tmdb_id'].isin(ids)]
+                        .reset_index(drop=True))
+            for media_type, ids in tmdb_ids.items()}
+
+def update_stats(df_movies:pd.DataFrame = None, df_series:pd.DataFrame = None):
+    """Update the statistics with the titles changed by the last extraction, or recompute
+    them over the whole catalogue when the state is missing, an extraction was not applied
+    or the periodic check is due. A full recompute is compared with the state it replaces.
+
+    Args:
+        df_movies (pd.DataFrame, optional): Enriched movie data. Defaults to None, only the
+            changed titles are extracted.
+        df_series (pd.DataFrame, optional): Enriched TV series data. Defaults to None, only the
+            changed titles are extracted.
+
+    Returns:
+        list: (name, stat_type, media_type, data_type, data) of each statistic
+    """
+    state = StatsState(STATS_STATE_PATH)
+    manifest = load_manifest()
+    reason = state.full_recompute_reason(manifest)
+
+    if reason is not None:
+        print(f"Full recompute of the statistics: {reason}")
+        if df_movies is None or df_series is None:
+            df_movies, df_series = load_media()
+        stats = compute_stats(df_movies, df_series)
+        if state.full_date is not None:
+            incremental = state.to_stats()
+            drifted = [f"{stat_type}/{media_type}" for _, stat_type, media_type, _, data in stats
+                    if not stats_match(data, incremental[(stat_type, media_type)])]
+            print(f"Incremental statistics drifted: {', '.join(drifted)}" if drifted
+                else "Incremental statistics match the full recompute")
+        state.rebuild({'movies': df_movies, 'series': df_series},
+                    manifest.get('extracted_at') if manifest else None)
+    else:
+        if manifest['extracted_at'] != state.extraction:
+            for media_type, (tmdb_ids, df) in load_delta(manifest, df_movies, df_series).items():
+                state.apply(media_type, df, tmdb_ids)
+                print(f"{media_type}: {len(tmdb_ids)} changed titles applied")
+            state.extraction = manifest['extracted_at']
+        stats = label_stats(state.to_stats())
+
+    state.save()
+    return stats
+
+def run(df_movies:pd.DataFrame = None, df_series:pd.DataFrame = None):
+    """Compute and save the statistics.
+
+    Args:
+        df_movies (pd.DataFrame, optional): Enriched movie data. Defaults to None, loaded
+            with load_media().
+        df_series (pd.DataFrame, optional): Enriched TV series data. Defaults to None, loaded
+            with load_media().
+    """
+    if STATS_INCREMENTAL:
+        save_stats(update_stats(df_movies, df_series))
+        return
+    if df_movies is None or df_series is None:
+        df_movies, df_series = load_media()
+    save_stats(compute_stats(df_movies, df_series))
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,88 @@
+"""
+@author: Joseph A.
+Description: Persistent on-disk cache with time-to-live eviction
+"""
+import os
+import json
+import dataclasses
+from datetime import datetime, timedelta
+
+@dataclasses.dataclass
+class DiskCache:
+    """JSON file backed cache whose entries expire after a time-to-live.
+
+    Entries are loaded once when the cache is created and written back with save().
+    """
+    path: str
+    ttl: timedelta
+    entries: dict = dataclasses.field(default_factory=dict)
+
+    def __post_init__(self):
+        self.load()
+
+    @staticmethod
+    def key(*parts):
+        """Build a cache key from its parts.
+
+        Returns:
+            str: Parts joined with ':' (e.g. 'movie:550')
+        """
+        return ":".join(str(part) for part in parts)
+
+    def is_expired(self, entry:dict):
+        """Check if a cache entry is older than the time-to-live.
+
+        Args:
+            entry (dict): Cache entry with a 'stored_at' ISO timestamp
+
+        Returns:
+            bool: True if the entry must be evicted
+        """
+        return datetime.now() - datetime.fromisoformat(entry['stored_at']) > self.ttl
+
+    def load(self):
+        """Load the cache file, evicting expired entries. A missing or corrupted file
+        gives an empty cache.
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable cache {self.path}: {e}")
+            return
+        self.entries = {key: entry for key, entry in entries.items()
+                        if not self.is_expired(entry)}
+
+    def get(self, key:str):
+        """Get a cached value.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Any: The cached value, or None if missing or expired
+        """
+        entry = self.entries.get(key)
+        if entry is None or self.is_expired(entry):
+            return None
+        return entry['value']
+
+    def set(self, key:str, value):
+        """Store a value in the cache.
+
+        Args:
+            key (str): Cache key
+            value (Any): JSON serializable value
+        """
+        self.entries[key] = {'value': value, 'stored_at': datetime.now().isoformat()}
+
+    def save(self):
+        """Write the cache back to disk atomically.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
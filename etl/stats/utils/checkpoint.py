@@ -0,0 +1,86 @@
+"""
+@author: Joseph A.
+Description: Typed columnar checkpoint (Parquet or Feather) of the enriched media,
+written by eda.py and read back by stats.py when it runs on its own.
+"""
+import os
+import pandas as pd
+from config.config import STATS_CHECKPOINT, CHECKPOINT_PATH
+
+CHECKPOINT_FORMATS = ('parquet', 'feather')
+
+def checkpoint_file(name:str, fmt:str = STATS_CHECKPOINT):
+    """Get the path of a checkpointed DataFrame.
+
+    Args:
+        name (str): Name of the DataFrame (e.g. 'movie')
+        fmt (str, optional): 'parquet' or 'feather'. Defaults to STATS_CHECKPOINT.
+
+    Returns:
+        str: Path of the checkpoint file
+    """
+    return os.path.join(CHECKPOINT_PATH, f"{name}_latest.{fmt}")
+
+def check_format(fmt:str):
+    """Check a checkpoint format.
+
+    Args:
+        fmt (str): 'none', 'parquet' or 'feather'
+
+    Raises:
+        ValueError: If the format is unknown
+
+    Returns:
+        bool: True if checkpoints are enabled
+    """
+    if fmt == 'none':
+        return False
+    if fmt not in CHECKPOINT_FORMATS:
+        raise ValueError(f"Unknown checkpoint format '{fmt}', expected one of "
+                        f"{('none',) + CHECKPOINT_FORMATS}")
+    return True
+
+def save_checkpoint(frames:dict, fmt:str = STATS_CHECKPOINT):
+    """Write DataFrames to the checkpoint, each file is replaced atomically so an interrupted
+    run leaves the previous checkpoint readable.
+
+    Args:
+        frames (dict): DataFrames by name
+        fmt (str, optional): 'none', 'parquet' or 'feather'. Defaults to STATS_CHECKPOINT.
+
+    Raises:
+        ValueError: If the format is unknown
+        ImportError: If pyarrow is not installed
+    """
+    if not check_format(fmt):
+        return
+    os.makedirs(CHECKPOINT_PATH, exist_ok=True)
+    for name, df in frames.items():
+        path = checkpoint_file(name, fmt)
+        tmp_path = f"{path}.tmp"
+        if fmt == 'parquet':
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.reset_index(drop=True).to_feather(tmp_path)
+        os.replace(tmp_path, path)
+
+def load_checkpoint(names:tuple, fmt:str = STATS_CHECKPOINT):
+    """Read DataFrames back from the checkpoint, with the dtypes they were written with.
+
+    Args:
+        names (tuple): Names of the DataFrames
+        fmt (str, optional): 'none', 'parquet' or 'feather'. Defaults to STATS_CHECKPOINT.
+
+    Raises:
+        ValueError: If the format is unknown
+
+    Returns:
+        dict: DataFrames by name, or None if checkpoints are disabled or one is missing
+    """
+    if not check_format(fmt):
+        return None
+    paths = {name: checkpoint_file(name, fmt) for name in names}
+    if not all(os.path.exists(path) for path in paths.values()):
+        return None
+    read = pd.read_parquet if fmt == 'parquet' else pd.read_feather
+    return {name: read(path) for name, path in paths.items()}
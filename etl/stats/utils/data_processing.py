@@ -2,7 +2,56 @@
 @author: Joseph A.
 Description: Utility functions for processing and transforming DataFrame data
 """
+import weakref
 import pandas as pd
+from utils.country_codes import COUNTRIES
+
+# Country names by two-letter code, unknown codes are kept as is like in the enriched columns
+COUNTRY_NAMES = {alpha_2: name for alpha_2, (_, name) in COUNTRIES.items()}
+
+# Split columns by (id(df), column_name), with a weak reference guarding against id reuse
+_split_cache = {}
+
+def split_column(df:pd.DataFrame, column_name:str):
+    """Split a comma-separated column into one value per row, computed once per DataFrame
+    and column so the distributions and ratings share the same result.
+
+    The cache assumes the column is not modified in place after the first call, its entries
+    are dropped with their DataFrame.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame containing the data
+        column_name (str): Name of the column containing comma-separated values
+
+    Raises:
+        ValueError: If the specified column doesn't exist in the DataFrame
+
+    Returns:
+        pd.Series: Stripped non-empty values, indexed by the position of their row in df
+    """
+    # Check if columns exist
+    if column_name not in df.columns:
+        raise ValueError(f"Column '{column_name}' doesn't exist in the Dataframe")
+
+    key = (id(df), column_name)
+    cached = _split_cache.get(key)
+    if cached is not None and cached[0]() is df:
+        return cached[1]
+
+    if column_name == 'country_name' and 'country_code' in df.columns:
+        # ISO names may contain ', ' (e.g. 'Congo, The Democratic Republic of the'), they are
+        # split through their codes, as in the media_country table of the in-database engine
+        codes = split_column(df, 'country_code')
+        split = codes.map(COUNTRY_NAMES).fillna(codes).rename(column_name)
+    else:
+        # An all-null column is read as float64, which has no .str accessor
+        values = pd.Series(df[column_name].to_numpy(), name=column_name).dropna().astype(object)
+        split = values.str.split(',').explode().str.strip()
+        split = split[split.notna() & (split != '')]
+
+    _split_cache[key] = (weakref.ref(df), split)
+    weakref.finalize(df, _split_cache.pop, key, None)
+    return split
 
 def count_split_data(df:pd.DataFrame, column_name:str):
     """Count occurrences of values in a comma-separated column.
@@ -19,21 +68,16 @@ def count_split_data(df:pd.DataFrame, column_name:str):
             - Index: unique values from the split column
             - Values: count of occurrences for each value
     """
-    # Check if columns exist
-    if column_name not in df.columns:
-        raise ValueError(f"Column '{column_name}' doesn't exist in the Dataframe")
-
-    split_values = df[column_name].fillna('').str.split(',\s*')
-    flattened_values = [value.strip() for sublist in split_values if isinstance(sublist, list)
-                    for value in sublist if value.strip()]
-    return pd.Series(flattened_values).value_counts()
+    return split_column(df, column_name).value_counts()
 
-def explode_split_data(df:pd.DataFrame, column_name:str):
+def explode_split_data(df:pd.DataFrame, column_name:str, columns:tuple = ('rating',)):
     """Explode a DataFrame based on a comma-separated column.
 
     Args:
         df (pd.DataFrame):  Input DataFrame containing the data
         column_name (str): Name of the column containing comma-separated values
+        columns (tuple, optional): Other columns to keep, only these are copied.
+            Defaults to ('rating',).
 
     Raises:
         ValueError: If the specified column doesn't exist in the DataFrame
@@ -41,20 +85,13 @@ def explode_split_data(df:pd.DataFrame, column_name:str):
     Returns:
         pd.DataFrame: Exploded DataFrame where:
             - Each comma-separated value gets its own row
-            - Original row data is duplicated for each split value
+            - The kept columns are duplicated for each split value
             - Empty values are removed
             - Index is reset
     """
-    # Check if columns exist
-    if column_name not in df.columns:
-        raise ValueError(f"Column '{column_name}' doesn't exist in the Dataframe")
-
-    df_copy = df.copy()
-
-    df_copy[column_name] = df_copy[column_name].fillna('').str.split(',\s*')
+    split = split_column(df, column_name)
 
-    df_exploded = df_copy.explode(column_name)
-    df_exploded[column_name] = df_exploded[column_name].str.strip()
-    df_exploded = df_exploded[df_exploded[column_name] != '']
+    df_exploded = df[list(columns)].iloc[split.index.to_numpy()].reset_index(drop=True)
+    df_exploded[column_name] = split.to_numpy()
 
-    return df_exploded.reset_index(drop=True)
+    return df_exploded
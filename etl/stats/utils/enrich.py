@@ -2,68 +2,64 @@
 @author: Joseph A.
 Description: Utilities for enriching media data with country information from TMDB API
 """
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
 import pandas as pd
 import requests
-import pycountry
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from tqdm import tqdm
 # My Libraries
-from config.config import TMDB_API_KEY, TMDB_BASE_URL
+from config.config import (TMDB_API_KEY, TMDB_BASE_URL, ENRICH_MAX_WORKERS, ENRICH_CACHE_PATH,
+                        ENRICH_CACHE_TTL_DAYS)
+from utils.cache import DiskCache
+from utils.country_codes import COUNTRIES
 
-def convert_country_code_to_name(country_code:str):
-    """Convert a two-letter country code to its full country name.
+# Lookups built once from the generated ISO table
+ALPHA_3 = {alpha_2: alpha_3 for alpha_2, (alpha_3, _) in COUNTRIES.items()}
+COUNTRY_NAMES = {alpha_2: name for alpha_2, (_, name) in COUNTRIES.items()}
+
+def map_country_codes(codes:pd.Series, lookup:dict):
+    """Convert a whole column of comma-separated country codes at once.
 
     Args:
-        country_code (str): Two-letter ISO 3166-1 alpha-2 country code
+        codes (pd.Series): Comma-separated two-letter country codes (e.g. 'US, GB'), may be null
+        lookup (dict): Two-letter code to value mapping (ALPHA_3 or COUNTRY_NAMES)
 
     Returns:
-        str: Full name of the country, or:
-            - Special case name for certain countries
-            - Original code if country cannot be found
+        pd.Series: Comma-separated converted values aligned on codes, unknown codes
+            are kept as is and null entries stay null
     """
-    special_cases = {
-        "KR": "South Korea",
-        "RU": "Russia",
-        "VN": "Vietnam",
-        "IR": "Iran",
-        "TW": "Taiwan",
-    }
-    try:
-        if country_code in special_cases:
-            return special_cases[country_code]
-        country = pycountry.countries.get(alpha_2=country_code)
-        return country.name if country else None
-    except KeyError:
-        return country_code
+    positions = codes.reset_index(drop=True).dropna()
+    exploded = positions.str.split(', ').explode()
+    converted = exploded.map(lookup).fillna(exploded)
+    joined = converted.groupby(level=0).agg(', '.join)
+    return pd.Series(joined.reindex(range(len(codes))).to_numpy(), index=codes.index, dtype=object)
 
-def convert_country_code_to_3(country_code:str):
-    """Convert a two-letter country code to its three-letter country code.
-
-    Args:
-        country_code (str): Two-letter ISO 3166-1 alpha-2 country code
+def create_session():
+    """Create a pooled HTTP session sized for the enrichment workers, retrying on throttling.
 
     Returns:
-        str: Three-letter of the country code, or:
-            - Original code if country cannot be found
+        requests.Session: Session shared by every worker
     """
-    try:
-        country = pycountry.countries.get(alpha_2=country_code)
-        return country.alpha_3 if country else None
-    except KeyError:
-        return country_code
+    session = requests.Session()
+    retries = Retry(total=5, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+                    respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=ENRICH_MAX_WORKERS, max_retries=retries)
+    session.mount('https://', adapter)
+    return session
 
-def get_media_origin_country(tmdb_id: int, media: str):
-    """Fetch origin country information for a media item from TMDB API.
+def fetch_origin_countries(tmdb_id: int, media: str, session=requests):
+    """Fetch the origin country codes of a media item from TMDB API.
 
     Args:
         tmdb_id (int): TMDB ID of the media item
         media (str): Type of media ('movie' or 'tv')
+        session (requests.Session, optional): Session used to send the request.
+            Defaults to the requests module.
 
     Returns:
-        tuple: A pair of (country_codes, country_code_3, country_names) where:
-            - country_codes (str): Comma-separated list of country codes
-            - country_codes_3 (str): Comma-separated list of country codes
-            - country_names (str): Comma-separated list of country names
-            - Returns (None, None, None) if no country information is found
+        list: Two-letter country codes, or None if the request failed
     """
     params = {
         'api_key': TMDB_API_KEY,
@@ -71,32 +67,28 @@ def get_media_origin_country(tmdb_id: int, media: str):
     }
     url = f'{TMDB_BASE_URL}/{media}/{tmdb_id}'
 
-    response = requests.get(url, params=params, timeout=10)
+    try:
+        response = session.get(url, params=params, timeout=10)
+    except requests.RequestException as e:
+        print(f"Error while getting {media}: {e}")
+        return None
     if response.status_code != 200:
         print(f"Error while getting {media}: {response.status_code}")
-        return []
-
-    data = response.json()
-    origin_countries = data.get("origin_country", [])
-
-    if origin_countries:
-        country_codes = origin_countries
-        country_code_3 = [convert_country_code_to_3(code) for code in origin_countries]
-        country_names = [convert_country_code_to_name(code) for code in origin_countries]
+        return None
 
-        country_codes_str = ", ".join(country_codes)
-        country_names_str = ", ".join(country_names)
-        country_code_3_str = ", ".join(country_code_3)
+    return response.json().get("origin_country", [])
 
-        return country_codes_str, country_code_3_str, country_names_str
-    return None, None, None
-
-def enrich_dataframe(df:pd.DataFrame, media:str):
+def enrich_dataframe(df:pd.DataFrame, media:str, cache:DiskCache = None):
     """Enrich a DataFrame with country information for each media item.
 
+    Origin countries are read from the on-disk cache when possible, the remaining
+    titles are fetched in parallel by a pool of ENRICH_MAX_WORKERS threads.
+
     Args:
         df (pd.DataFrame): DataFrame containing media information with tmdb_id column
         media (str): Type of media ('movie' or 'tv')
+        cache (DiskCache, optional): Cache of origin countries keyed by (media, tmdb_id).
+            Defaults to the cache stored at ENRICH_CACHE_PATH.
 
     Returns:
         pd.DataFrame: Enriched DataFrame with additional columns:
@@ -104,14 +96,31 @@ def enrich_dataframe(df:pd.DataFrame, media:str):
             - country_code_3: Comma-separated list of country codes
             - country_name: Comma-separated list of country names
     """
-    df['country_code'] = None
-    df['country_code_3'] = None
-    df['country_name'] = None
-
-    for idx, row in tqdm(df.iterrows(), total=df.shape[0], desc=f"Processing {media}"):
-        country_code, country_code_3, country_name = get_media_origin_country(row['tmdb_id'], media)
-        df.at[idx, 'country_code'] = country_code
-        df.at[idx, 'country_code_3'] = country_code_3
-        df.at[idx, 'country_name'] = country_name
+    if cache is None:
+        cache = DiskCache(ENRICH_CACHE_PATH, timedelta(days=ENRICH_CACHE_TTL_DAYS))
+
+    tmdb_ids = [int(tmdb_id) for tmdb_id in df['tmdb_id']]
+    countries = {tmdb_id: cache.get(DiskCache.key(media, tmdb_id)) for tmdb_id in set(tmdb_ids)}
+    missing = [tmdb_id for tmdb_id, codes in countries.items() if codes is None]
+    print(f"{media}: {len(countries) - len(missing)} cached, {len(missing)} to fetch")
+
+    if missing:
+        with create_session() as session, ThreadPoolExecutor(ENRICH_MAX_WORKERS) as executor:
+            futures = {executor.submit(fetch_origin_countries, tmdb_id, media, session): tmdb_id
+                    for tmdb_id in missing}
+            for future in tqdm(as_completed(futures), total=len(futures),
+                            desc=f"Processing {media}"):
+                tmdb_id = futures[future]
+                codes = future.result()
+                if codes is not None: # Failed requests are retried on the next run
+                    cache.set(DiskCache.key(media, tmdb_id), codes)
+                    countries[tmdb_id] = codes
+        cache.save()
+
+    country_codes = pd.Series([", ".join(countries[tmdb_id]) if countries[tmdb_id] else None
+                            for tmdb_id in tmdb_ids], index=df.index, dtype=object)
+    df['country_code'] = country_codes
+    df['country_code_3'] = map_country_codes(country_codes, ALPHA_3)
+    df['country_name'] = map_country_codes(country_codes, COUNTRY_NAMES)
 
     return df
@@ -0,0 +1,45 @@
+"""
+@author: Joseph A.
+Description: Generate utils/country_codes.py, the precomputed ISO 3166-1 lookup table used
+by the enrichment. Run from etl/stats after upgrading pycountry:
+    python -m utils.generate_country_codes
+"""
+import os
+from importlib.metadata import version
+import pycountry
+
+# Names displayed instead of the official ISO names
+SPECIAL_CASES = {
+    "KR": "South Korea",
+    "RU": "Russia",
+    "VN": "Vietnam",
+    "IR": "Iran",
+    "TW": "Taiwan",
+}
+
+HEADER = '''"""
+@author: Joseph A.
+Description: Precomputed ISO 3166-1 lookup table, alpha-2 -> (alpha-3, display name).
+Generated by utils/generate_country_codes.py from pycountry {version}, do not edit.
+"""
+
+COUNTRIES = {{
+'''
+
+def generate(path:str):
+    """Write the lookup table module.
+
+    Args:
+        path (str): Path of the generated module
+    """
+    lines = [HEADER.format(version=version('pycountry'))]
+    for country in sorted(pycountry.countries, key=lambda c: c.alpha_2):
+        name = SPECIAL_CASES.get(country.alpha_2, country.name)
+        lines.append(f"    {country.alpha_2!r}: ({country.alpha_3!r}, {name!r}),\n")
+    lines.append("}\n")
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+
+if __name__ == "__main__":
+    generate(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'country_codes.py'))
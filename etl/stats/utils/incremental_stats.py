@@ -0,0 +1,232 @@
+"""
+@author: Joseph A.
+Description: Mergeable state of the statistics, updated with the titles changed by the last
+extraction instead of being recomputed over the whole catalogue
+"""
+import os
+import json
+import math
+import dataclasses
+from datetime import date
+import pandas as pd
+from config.config import STATS_FULL_RECOMPUTE_DAYS
+from utils.data_processing import split_column
+from utils.sql_stats import MIN_RATINGS
+
+MEDIA_TYPES = ('movies', 'series')
+
+# Column counted by each distribution statistic
+DISTRIBUTIONS = {
+    'country_distribution': 'country_code_3',
+    'genre_distribution': 'genre',
+    'yearly_distribution': 'year',
+}
+
+# Column grouping the ratings of each ratings statistic
+RATINGS = {
+    'country_avg_ratings': 'country_name',
+    'genre_avg_ratings': 'genre',
+}
+
+# Comma-separated columns, a title contributes once per value
+SPLIT_COLUMNS = ('country_code_3', 'genre', 'country_name')
+
+def title_contributions(df:pd.DataFrame):
+    """Get what each title adds to the statistics.
+
+    Args:
+        df (pd.DataFrame): Enriched media data
+
+    Yields:
+        tuple: (tmdb_id, contribution) where contribution holds the values of each counted
+            column (lists of strings) and the rating (None if missing)
+    """
+    split = {column: split_column(df, column).groupby(level=0).agg(list)
+            for column in SPLIT_COLUMNS}
+    years = pd.to_datetime(df['release_date']).dt.year.to_numpy()
+    ratings = df['rating'].to_numpy()
+
+    for position, tmdb_id in enumerate(df['tmdb_id'].to_numpy()):
+        contribution = {column: split[column].get(position, []) for column in SPLIT_COLUMNS}
+        year, rating = years[position], ratings[position]
+        contribution['year'] = [] if pd.isna(year) else [str(int(year))]
+        contribution['rating'] = None if pd.isna(rating) else float(rating)
+        yield str(int(tmdb_id)), contribution
+
+def stats_match(expected, actual):
+    """Check that two computations of a statistic agree, up to floating point error.
+
+    Args:
+        expected (Union[pd.Series, pd.DataFrame]): Statistic computed over the whole catalogue
+        actual (Union[pd.Series, pd.DataFrame]): Statistic of the incremental state
+
+    Returns:
+        bool: True if they hold the same keys and values
+    """
+    if isinstance(expected, pd.Series):
+        return expected.to_dict() == actual.to_dict()
+    if set(expected.index) != set(actual.index):
+        return False
+    actual = actual.loc[expected.index]
+    return (expected['count'].tolist() == actual['count'].tolist()
+            and all(math.isclose(a, b, rel_tol=1e-9)
+                    for a, b in zip(expected['mean'], actual['mean'])))
+
+@dataclasses.dataclass
+class StatsState:
+    """Counts per key of the distributions, rating sums and counts per key of the ratings,
+    and the contribution of each title so a changed title can be subtracted again.
+
+    The state is loaded once when it is created and written back with save().
+    """
+    path: str
+    titles: dict = dataclasses.field(default_factory=dict)
+    counts: dict = dataclasses.field(default_factory=dict)
+    ratings: dict = dataclasses.field(default_factory=dict)
+    full_date: str = None # Date of the last full recompute
+    extraction: str = None # extracted_at of the last applied extraction
+
+    def __post_init__(self):
+        self.reset()
+        self.load()
+
+    def reset(self):
+        """Empty the state.
+        """
+        self.titles = {media_type: {} for media_type in MEDIA_TYPES}
+        self.counts = {media_type: {column: {} for column in DISTRIBUTIONS.values()}
+                    for media_type in MEDIA_TYPES}
+        self.ratings = {media_type: {column: {} for column in RATINGS.values()}
+                        for media_type in MEDIA_TYPES}
+        self.full_date = self.extraction = None
+
+    def load(self):
+        """Load the state file. A missing or corrupted file gives an empty state, which
+        triggers a full recompute.
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable statistics state {self.path}: {e}")
+            return
+        self.titles, self.counts, self.ratings = state['titles'], state['counts'], state['ratings']
+        self.full_date, self.extraction = state['full_date'], state['extraction']
+
+    def save(self):
+        """Write the state back to disk atomically.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'titles': self.titles, 'counts': self.counts, 'ratings': self.ratings,
+                    'full_date': self.full_date, 'extraction': self.extraction}, f)
+        os.replace(tmp_path, self.path)
+
+    def merge(self, media_type:str, contribution:dict, sign:int):
+        """Add (sign=1) or subtract (sign=-1) the contribution of a title.
+
+        Args:
+            media_type (str): 'movies' or 'series'
+            contribution (dict): Contribution of the title, see title_contributions
+            sign (int): 1 or -1
+        """
+        for column in DISTRIBUTIONS.values():
+            counts = self.counts[media_type][column]
+            for key in contribution[column]:
+                counts[key] = counts.get(key, 0) + sign
+                if not counts[key]:
+                    del counts[key]
+
+        if contribution['rating'] is None:
+            return
+        for column in RATINGS.values():
+            ratings = self.ratings[media_type][column]
+            for key in contribution[column]:
+                total, count = ratings.get(key, (0.0, 0))
+                if count + sign:
+                    ratings[key] = [total + sign * contribution['rating'], count + sign]
+                else:
+                    del ratings[key]
+
+    def apply(self, media_type:str, df:pd.DataFrame, tmdb_ids:list):
+        """Replace the contributions of changed titles.
+
+        Args:
+            media_type (str): 'movies' or 'series'
+            df (pd.DataFrame): Current data of the titles, titles missing from it are removed
+            tmdb_ids (list): tmdb_ids of the added, changed and removed titles
+        """
+        titles = self.titles[media_type]
+        for tmdb_id in tmdb_ids:
+            previous = titles.pop(str(tmdb_id), None)
+            if previous is not None:
+                self.merge(media_type, previous, -1)
+        for tmdb_id, contribution in title_contributions(df):
+            if tmdb_id in titles: # tmdb_id is unique in the tables, never count a title twice
+                self.merge(media_type, titles[tmdb_id], -1)
+            titles[tmdb_id] = contribution
+            self.merge(media_type, contribution, 1)
+
+    def rebuild(self, frames:dict, extraction:str = None):
+        """Rebuild the state from the whole catalogue.
+
+        Args:
+            frames (dict): Enriched media data by media type
+            extraction (str, optional): extracted_at of the extraction the data comes from
+        """
+        self.reset()
+        for media_type, df in frames.items():
+            self.apply(media_type, df, [])
+        self.full_date = date.today().isoformat()
+        self.extraction = extraction
+
+    def full_recompute_reason(self, manifest:dict, today:date = None):
+        """Check whether the statistics must be recomputed over the whole catalogue.
+
+        Args:
+            manifest (dict): Delta manifest of the last extraction, None if there is none
+            today (date, optional): Date of the run. Defaults to today.
+
+        Returns:
+            str: Reason of the full recompute, None if the delta can be applied
+        """
+        today = today or date.today()
+        if self.full_date is None:
+            return "no statistics state"
+        if manifest is None:
+            return "no delta manifest"
+        if (today - date.fromisoformat(self.full_date)).days >= STATS_FULL_RECOMPUTE_DAYS:
+            return f"periodic check, every {STATS_FULL_RECOMPUTE_DAYS} days"
+        if manifest.get('extracted_at') is None:
+            return "delta manifest without extraction time"
+        if self.extraction not in (manifest['extracted_at'], manifest['previous_extracted_at']):
+            return "an extraction was not applied"
+        return None
+
+    def to_stats(self):
+        """Build the statistics from the state, shaped like their full computation.
+
+        Returns:
+            dict: pd.Series (distributions) or pd.DataFrame (ratings) by (stat_type, media_type)
+        """
+        stats = {}
+        for media_type in MEDIA_TYPES:
+            for stat_type, column in DISTRIBUTIONS.items():
+                counts = pd.Series(self.counts[media_type][column], dtype='int64')
+                if column == 'year':
+                    counts = counts.rename(index=int).sort_index()
+                else:
+                    counts = counts.sort_values(ascending=False, kind='stable')
+                stats[(stat_type, media_type)] = counts
+
+            for stat_type, column in RATINGS.items():
+                values = pd.DataFrame.from_dict(self.ratings[media_type][column], orient='index',
+                                                columns=['sum', 'count'])
+                values = values[values['count'] >= MIN_RATINGS]
+                ratings = pd.DataFrame({'mean': values['sum'] / values['count'],
+                                        'count': values['count'].astype('int64')})
+                stats[(stat_type, media_type)] = ratings.sort_values('mean', ascending=False)
+        return stats
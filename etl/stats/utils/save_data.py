@@ -5,50 +5,110 @@ Description: Utility functions for saving statistical data to JSON files and Pos
 import os
 import json
 import psycopg2
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_values
 from datetime import datetime
 from dotenv import load_dotenv
+from utils.country_codes import COUNTRIES
+from utils.sql_stats import LINK_TABLES_DDL
 
 # Load environment variables
 ETL_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 load_dotenv(os.path.join(ETL_DIR, '.env'))
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-def save_json_data(data, filename: str, base_path: str, data_type: str = 'distribution'):
-    """Save pandas data (Series or DataFrame) to a JSON file.
+# Connection shared by the writers of this module, opened on first use
+connection = None
+
+def get_connection():
+    """Get the connection shared by the writers, reopened if it was closed.
+
+    Returns:
+        psycopg2.extensions.connection: Open connection
+    """
+    global connection # pylint: disable=W0603:global-statement
+    if connection is None or connection.closed:
+        connection = psycopg2.connect(DATABASE_URL)
+    return connection
+
+def build_payload(data, data_type: str = 'distribution'):
+    """Build the JSON document of a statistic, saved both to a file and to PostgreSQL.
 
     Args:
         data (Union[pd.Series, pd.DataFrame]): Data to save:
             - Series for distribution data
             - DataFrame for ratings data (must have 'mean' and 'count' columns)
-        filename (str): Name of the output file (without extension)
-        base_path (str): Directory path where to save the JSON file
-        data_type (str, optional):Type of data to save ('distribution' or 'ratings'). 
+        data_type (str, optional): Type of data ('distribution' or 'ratings').
             Defaults to 'distribution'.
 
     Raises:
         ValueError: If data_type is 'ratings' but DataFrame doesn't have required columns
-    """
-    os.makedirs(base_path, exist_ok=True)
 
+    Returns:
+        dict: Document with the data and its totals
+    """
     if data_type == 'distribution':
-        json_data = {
+        return {
             'data': data.to_dict(),
             'total': int(data.sum()),
             'count': len(data)
         }
-    else:  # ratings
-        if not all(col in data.columns for col in ['mean', 'count']):
-            raise ValueError("Ratings DataFrame must have 'mean' and 'count' columns")
-
-        json_data = {
-            'data': data.round(2).to_dict(orient='index'),
-            'total_ratings': int(data['count'].sum()),
-            'average_rating': float(data['mean'].mean().round(2))
-        }
 
+    # ratings
+    if not all(col in data.columns for col in ['mean', 'count']):
+        raise ValueError("Ratings DataFrame must have 'mean' and 'count' columns")
+    return {
+        'data': data.round(2).to_dict(orient='index'),
+        'total_ratings': int(data['count'].sum()),
+        'average_rating': float(data['mean'].mean().round(2))
+    }
+
+def write_json(payload: dict, filename: str, base_path: str):
+    """Write a JSON document built by build_payload to a file.
+
+    Args:
+        payload (dict): Document to write
+        filename (str): Name of the output file (without extension)
+        base_path (str): Directory path where to save the JSON file
+    """
+    os.makedirs(base_path, exist_ok=True)
     with open(os.path.join(base_path, f'{filename}.json'), 'w', encoding='utf-8') as f:
-        json.dump(json_data, f, ensure_ascii=False, indent=2)
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+def save_json_data(data, filename: str, base_path: str, data_type: str = 'distribution'):
+    """Save pandas data (Series or DataFrame) to a JSON file.
+
+    Args:
+        data (Union[pd.Series, pd.DataFrame]): Data to save:
+            - Series for distribution data
+            - DataFrame for ratings data (must have 'mean' and 'count' columns)
+        filename (str): Name of the output file (without extension)
+        base_path (str): Directory path where to save the JSON file
+        data_type (str, optional):Type of data to save ('distribution' or 'ratings'). 
+            Defaults to 'distribution'.
+
+    Raises:
+        ValueError: If data_type is 'ratings' but DataFrame doesn't have required columns
+    """
+    write_json(build_payload(data, data_type), filename, base_path)
+
+
+def save_stats_to_postgres(rows: list):
+    """Upsert statistics into the PostgreSQL stats table in a single statement and
+    transaction, readers see either all the new statistics or none of them.
+
+    Args:
+        rows (list): (stat_type, media_type, payload) of each statistic, payloads built
+            by build_payload
+    """
+    created_at = datetime.now()
+    conn = get_connection()
+    with conn, conn.cursor() as cursor:
+        execute_values(cursor, """
+            INSERT INTO stats (stat_type, media_type, data, created_at) VALUES %s
+            ON CONFLICT (stat_type, media_type)
+            DO UPDATE SET data = EXCLUDED.data, created_at = EXCLUDED.created_at
+        """, [(stat_type, media_type, Json(payload), created_at)
+            for stat_type, media_type, payload in rows])
 
 
 def save_to_postgres(data, stat_type: str, media_type: str, data_type: str = 'distribution'):
@@ -60,29 +120,39 @@ def save_to_postgres(data, stat_type: str, media_type: str, data_type: str = 'di
         media_type (str): 'movies' or 'series'
         data_type (str, optional): Type of data ('distribution' or 'ratings'). Defaults to 'distribution'.
     """
-    if data_type == 'distribution':
-        json_data = {
-            'data': data.to_dict(),
-            'total': int(data.sum()),
-            'count': len(data)
-        }
-    else:  # ratings
-        json_data = {
-            'data': data.round(2).to_dict(orient='index'),
-            'total_ratings': int(data['count'].sum()),
-            'average_rating': float(data['mean'].mean().round(2))
-        }
+    save_stats_to_postgres([(stat_type, media_type, build_payload(data, data_type))])
 
-    conn = psycopg2.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    try:
-        cursor.execute("""
-            INSERT INTO stats (stat_type, media_type, data, created_at)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT (stat_type, media_type)
-            DO UPDATE SET data = EXCLUDED.data, created_at = EXCLUDED.created_at
-        """, (stat_type, media_type, Json(json_data), datetime.now()))
-        conn.commit()
-    finally:
-        cursor.close()
-        conn.close()
+
+def save_media_countries(df, media_type: str):
+    """Replace the origin countries of a media type in the normalized media_country table,
+    for the in-database statistics engine.
+
+    Args:
+        df (pd.DataFrame): Enriched DataFrame with tmdb_id and country_code columns
+        media_type (str): 'movies' or 'series'
+    """
+    # Only the codes are split: ISO names may contain ', ' (e.g. 'Korea, Republic of')
+    codes = df[['tmdb_id', 'country_code']].dropna(subset=['country_code'])
+    codes = codes.assign(country_code=codes['country_code'].str.split(', '))
+    codes = codes.explode('country_code').drop_duplicates(['tmdb_id', 'country_code'])
+    links = [(int(tmdb_id), code) for tmdb_id, code in codes.itertuples(index=False)]
+    # Unknown codes are kept as is, like in the enriched columns
+    names = [(code, *COUNTRIES.get(code, (code, code)))
+            for code in codes['country_code'].unique()]
+
+    conn = get_connection()
+    with conn, conn.cursor() as cursor:
+        cursor.execute(LINK_TABLES_DDL)
+        execute_values(cursor, """
+            INSERT INTO countries (code, code_3, name) VALUES %s
+            ON CONFLICT (code) DO UPDATE SET code_3 = EXCLUDED.code_3, name = EXCLUDED.name
+            WHERE (countries.code_3, countries.name)
+                IS DISTINCT FROM (EXCLUDED.code_3, EXCLUDED.name)
+        """, names)
+        cursor.execute("DELETE FROM media_country WHERE media_type = %s", (media_type,))
+        execute_values(cursor, """
+            INSERT INTO media_country (media_type, tmdb_id, country_id)
+            SELECT v.media_type, v.tmdb_id, c.id
+            FROM (VALUES %s) AS v (media_type, tmdb_id, code)
+            JOIN countries c ON c.code = v.code
+        """, [(media_type, tmdb_id, code) for tmdb_id, code in links], page_size=1000)
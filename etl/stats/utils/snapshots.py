@@ -0,0 +1,174 @@
+"""
+@author: Joseph A.
+Description: Partitioned Parquet store of the daily snapshots of the enriched media, one partition
+per snapshot date and media type, read back by date range with predicate pushdown.
+"""
+import os
+import re
+import operator
+from functools import reduce
+from datetime import date, datetime
+import pandas as pd
+from config.config import SNAPSHOT_PATH
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError: # pyarrow is optional, the daily CSV snapshots work without it
+    pa = ds = None
+
+MEDIA_TYPES = ('movies', 'series')
+
+# Low cardinality text columns, stored dictionary-encoded and read back as categoricals
+DICTIONARY_COLUMNS = ('genre', 'country_code', 'country_code_3', 'country_name')
+
+# Other columns of the enriched media and their Arrow type name
+COLUMN_TYPES = {
+    'id': 'int64',
+    'title': 'string',
+    'release_date': 'date32',
+    'rating': 'float64',
+    'tmdb_id': 'int64',
+    'original_language': 'string',
+    'poster_path': 'string',
+}
+
+# Daily CSV snapshots written by eda.py (e.g. movie_18_10_26.csv)
+CSV_SNAPSHOT_PATTERN = re.compile(r'^(movie|serie)_(\d{2}_\d{2}_\d{2})\.csv$')
+
+def partitioning():
+    """Get the partitioning of the store, snapshot_date=YYYY-MM-DD/media_type=movies directories.
+
+    Raises:
+        ImportError: If pyarrow is not installed
+
+    Returns:
+        pyarrow.dataset.Partitioning: Hive partitioning with a typed date
+    """
+    if ds is None:
+        raise ImportError("pyarrow is required for the snapshot store (parquet extra)")
+    return ds.partitioning(pa.schema([('snapshot_date', pa.date32()),
+                                    ('media_type', pa.string())]), flavor='hive')
+
+def snapshot_schema():
+    """Get the schema every partition is written with. Types inferred from a single day
+    would differ between partitions: int8 dictionary indices overflow past 127 categories,
+    and an all-null column has no type.
+
+    Raises:
+        ImportError: If pyarrow is not installed
+
+    Returns:
+        pyarrow.Schema: Columns of the enriched media, without the partition columns
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for the snapshot store (parquet extra)")
+    fields = [(column, pa.type_for_alias(name)) for column, name in COLUMN_TYPES.items()]
+    fields += [(column, pa.dictionary(pa.int32(), pa.string())) for column in DICTIONARY_COLUMNS]
+    return pa.schema(fields)
+
+def write_snapshot(df:pd.DataFrame, media_type:str, snapshot_date:date = None,
+                path:str = SNAPSHOT_PATH):
+    """Write the snapshot of a media type, replacing the partition if it already exists.
+    Columns outside snapshot_schema are not stored, missing ones are stored as nulls.
+
+    Args:
+        df (pd.DataFrame): Enriched media data
+        media_type (str): 'movies' or 'series'
+        snapshot_date (date, optional): Date of the snapshot. Defaults to today.
+        path (str, optional): Root directory of the store. Defaults to SNAPSHOT_PATH.
+
+    Raises:
+        ValueError: If the media type is unknown
+        ImportError: If pyarrow is not installed
+    """
+    if media_type not in MEDIA_TYPES:
+        raise ValueError(f"Unknown media type '{media_type}', expected one of {MEDIA_TYPES}")
+    partitions = partitioning()
+    schema = snapshot_schema()
+
+    # Dates read from PostgreSQL or parsed from a CSV snapshot are converted to the same type
+    missing = {column: None for column in schema.names if column not in df.columns}
+    table = pa.Table.from_pandas(df.assign(**missing), schema=schema, preserve_index=False)
+    table = table.append_column('snapshot_date', pa.array(
+        [snapshot_date or date.today()] * table.num_rows, pa.date32()))
+    table = table.append_column('media_type', pa.array([media_type] * table.num_rows))
+
+    ds.write_dataset(table, path, format='parquet', partitioning=partitions,
+                    basename_template='part-{i}.parquet',
+                    existing_data_behavior='delete_matching')
+
+def read_snapshots(start:date = None, end:date = None, media_type:str = None,
+                columns:list = None, path:str = SNAPSHOT_PATH):
+    """Read the snapshots of a date range. Partitions outside the range are skipped
+    without being opened, only the requested columns are read.
+
+    Args:
+        start (date, optional): First snapshot date, included. Defaults to None, no lower bound.
+        end (date, optional): Last snapshot date, included. Defaults to None, no upper bound.
+        media_type (str, optional): 'movies' or 'series'. Defaults to None, both.
+        columns (list, optional): Columns to read. Defaults to None, every column.
+        path (str, optional): Root directory of the store. Defaults to SNAPSHOT_PATH.
+
+    Raises:
+        ImportError: If pyarrow is not installed
+        FileNotFoundError: If the store doesn't exist
+
+    Returns:
+        pd.DataFrame: One row per title and snapshot, with 'snapshot_date' and 'media_type'
+    """
+    partitions = partitioning()
+    # Given explicitly, the schema of the first partition would be applied to the others
+    schema = pa.unify_schemas([snapshot_schema(), partitions.schema])
+    dataset = ds.dataset(path, format='parquet', partitioning=partitions, schema=schema)
+
+    conditions = []
+    if start is not None:
+        conditions.append(ds.field('snapshot_date') >= start)
+    if end is not None:
+        conditions.append(ds.field('snapshot_date') <= end)
+    if media_type is not None:
+        conditions.append(ds.field('media_type') == media_type)
+    expression = reduce(operator.and_, conditions) if conditions else None
+
+    if columns is not None:
+        columns = list(dict.fromkeys(['snapshot_date', 'media_type', *columns]))
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+def list_snapshot_dates(path:str = SNAPSHOT_PATH):
+    """List the dates of the snapshots in the store, from the partition directories.
+
+    Args:
+        path (str, optional): Root directory of the store. Defaults to SNAPSHOT_PATH.
+
+    Returns:
+        list: Sorted snapshot dates
+    """
+    if not os.path.isdir(path):
+        return []
+    return sorted(date.fromisoformat(name.removeprefix('snapshot_date='))
+                for name in os.listdir(path) if name.startswith('snapshot_date='))
+
+def import_csv_snapshots(clean_path:str = os.path.join('db', 'clean'), path:str = SNAPSHOT_PATH):
+    """Import the daily CSV snapshots written by eda.py into the store.
+
+    Args:
+        clean_path (str, optional): Directory of the CSV snapshots, searched recursively.
+            Defaults to 'db/clean'.
+        path (str, optional): Root directory of the store. Defaults to SNAPSHOT_PATH.
+
+    Returns:
+        int: Number of imported files
+    """
+    imported = 0
+    for directory, _, filenames in os.walk(clean_path):
+        for filename in filenames:
+            match = CSV_SNAPSHOT_PATTERN.match(filename)
+            if match is None:
+                continue
+            media, day = match.groups()
+            snapshot_date = datetime.strptime(day, "%d_%m_%y").date()
+            df = pd.read_csv(os.path.join(directory, filename))
+            write_snapshot(df, 'movies' if media == 'movie' else 'series', snapshot_date, path)
+            imported += 1
+    return imported
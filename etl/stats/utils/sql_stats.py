@@ -0,0 +1,180 @@
+"""
+@author: Joseph A.
+Description: In-database engine computing the ten statistics as a materialized view,
+refreshed concurrently so the API keeps reading the previous values during a refresh.
+"""
+import hashlib
+import psycopg2
+from config.config import POSTGRES_URL, LINK_TABLES_SQL
+
+# Materialized view holding one row per (stat_type, media_type), shaped like the stats table
+STATS_VIEW = 'stats_views'
+
+# Table and release date column of each media type
+MEDIA_TABLES = {
+    'movies': ('movies', 'release_date'),
+    'series': ('series', 'first_air_date'),
+}
+
+# Minimum number of ratings of a genre or country to appear in the ratings statistics
+MIN_RATINGS = 3
+
+# Normalized genres and origin countries, the Airflow loader fills media_genre (and
+# media_country for series), the enrichment step fills media_country
+with open(LINK_TABLES_SQL, 'r', encoding='utf-8') as f:
+    LINK_TABLES_DDL = f.read()
+
+def genre_source(media_type:str):
+    """Build the query listing the (genre, rating) pairs of a media type.
+
+    Args:
+        media_type (str): 'movies' or 'series'
+
+    Returns:
+        str: SELECT returning 'value' and 'rating' columns, one row per genre of each title
+    """
+    table, _ = MEDIA_TABLES[media_type]
+    return f"""
+        SELECT g.name AS value, t.rating
+        FROM media_genre mg
+        JOIN genres g ON g.id = mg.genre_id
+        JOIN {table} t ON t.tmdb_id = mg.tmdb_id
+        WHERE mg.media_type = '{media_type}'
+    """
+
+def country_source(media_type:str, column:str):
+    """Build the query listing the (country, rating) pairs of a media type.
+
+    Args:
+        media_type (str): 'movies' or 'series'
+        column (str): Country column to use ('code_3' or 'name'), unknown countries
+            fall back to their two-letter code
+
+    Returns:
+        str: SELECT returning 'value' and 'rating' columns, one row per country of each title
+    """
+    table, _ = MEDIA_TABLES[media_type]
+    return f"""
+        SELECT coalesce(c.{column}, c.code) AS value, t.rating
+        FROM media_country mc
+        JOIN countries c ON c.id = mc.country_id
+        JOIN {table} t ON t.tmdb_id = mc.tmdb_id
+        WHERE mc.media_type = '{media_type}'
+    """
+
+def year_source(media_type:str):
+    """Build the query listing the release year of each title of a media type.
+
+    Args:
+        media_type (str): 'movies' or 'series'
+
+    Returns:
+        str: SELECT returning a 'value' column
+    """
+    table, date_column = MEDIA_TABLES[media_type]
+    return f"""
+        SELECT extract(year FROM {date_column})::int::text AS value
+        FROM {table} WHERE {date_column} IS NOT NULL
+    """
+
+def distribution_query(stat_type:str, media_type:str, source:str):
+    """Build the row of a distribution statistic, shaped like save_json_data's output.
+
+    Args:
+        stat_type (str): Type of statistic (e.g. 'genre_distribution')
+        media_type (str): 'movies' or 'series'
+        source (str): Query returning a 'value' column
+
+    Returns:
+        str: SELECT returning (stat_type, media_type, data)
+    """
+    return f"""
+        SELECT '{stat_type}' AS stat_type, '{media_type}' AS media_type,
+            jsonb_build_object(
+                'data', coalesce(jsonb_object_agg(value, n), '{{}}'::jsonb),
+                'total', coalesce(sum(n), 0),
+                'count', count(*)
+            ) AS data
+        FROM (SELECT value, count(*) AS n FROM ({source}) s GROUP BY value) counts
+    """
+
+def ratings_query(stat_type:str, media_type:str, source:str):
+    """Build the row of a ratings statistic, shaped like save_json_data's output.
+
+    Args:
+        stat_type (str): Type of statistic (e.g. 'genre_avg_ratings')
+        media_type (str): 'movies' or 'series'
+        source (str): Query returning 'value' and 'rating' columns
+
+    Returns:
+        str: SELECT returning (stat_type, media_type, data)
+    """
+    return f"""
+        SELECT '{stat_type}' AS stat_type, '{media_type}' AS media_type,
+            jsonb_build_object(
+                'data', coalesce(jsonb_object_agg(value, jsonb_build_object(
+                    'mean', round(mean::numeric, 2), 'count', n)), '{{}}'::jsonb),
+                'total_ratings', coalesce(sum(n), 0),
+                'average_rating', round(avg(mean)::numeric, 2)
+            ) AS data
+        FROM (
+            SELECT value, avg(rating) AS mean, count(rating) AS n
+            FROM ({source}) s GROUP BY value HAVING count(rating) >= {MIN_RATINGS}
+        ) ratings
+    """
+
+def build_stats_view_query():
+    """Build the query of the statistics materialized view.
+
+    Returns:
+        str: UNION of the ten statistics, with the refresh time as created_at
+    """
+    rows = []
+    for media_type in MEDIA_TABLES:
+        rows += [
+            distribution_query('country_distribution', media_type,
+                            country_source(media_type, 'code_3')),
+            distribution_query('genre_distribution', media_type, genre_source(media_type)),
+            distribution_query('yearly_distribution', media_type, year_source(media_type)),
+            ratings_query('country_avg_ratings', media_type,
+                        country_source(media_type, 'name')),
+            ratings_query('genre_avg_ratings', media_type, genre_source(media_type)),
+        ]
+    union = "\nUNION ALL\n".join(rows)
+    return (f"SELECT stat_type, media_type, data, now()::timestamp AS created_at "
+            f"FROM ({union}) stats")
+
+def create_stats_views(cursor):
+    """Create the genre and country tables and the statistics materialized view if needed.
+    The hash of the view query is stored as the comment of the view, a view built from
+    another query is dropped and created again.
+
+    Args:
+        cursor (psycopg2.extensions.cursor): Open cursor
+    """
+    cursor.execute(LINK_TABLES_DDL)
+    query = build_stats_view_query()
+    version = hashlib.sha1(query.encode('utf-8')).hexdigest()
+    cursor.execute("SELECT obj_description(to_regclass(%s), 'pg_class')", (STATS_VIEW,))
+    if cursor.fetchone()[0] == version:
+        return
+
+    cursor.execute(f"DROP MATERIALIZED VIEW IF EXISTS {STATS_VIEW}")
+    cursor.execute(f"CREATE MATERIALIZED VIEW {STATS_VIEW} AS {query}")
+    cursor.execute(f"COMMENT ON MATERIALIZED VIEW {STATS_VIEW} IS %s", (version,))
+    # REFRESH ... CONCURRENTLY requires a unique index
+    cursor.execute(f"""
+        CREATE UNIQUE INDEX {STATS_VIEW}_key ON {STATS_VIEW} (stat_type, media_type)
+    """)
+
+def refresh_stats_views():
+    """Recompute every statistic in PostgreSQL, readers are not blocked during the refresh.
+    """
+    conn = psycopg2.connect(POSTGRES_URL)
+    try:
+        with conn.cursor() as cursor:
+            create_stats_views(cursor)
+            cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {STATS_VIEW}")
+        conn.commit()
+    finally:
+        conn.close()
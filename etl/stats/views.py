@@ -0,0 +1,16 @@
+"""
+@author: Joseph A.
+Description: Script refreshing the statistics computed in PostgreSQL (STATS_ENGINE=sql),
+used instead of stats.py. The origin countries are saved by eda.py beforehand.
+"""
+from utils.sql_stats import refresh_stats_views, STATS_VIEW
+
+def run():
+    """Refresh the statistics materialized view.
+    """
+    print(f"Refreshing {STATS_VIEW} in PostgreSQL...")
+    refresh_stats_views()
+    print("Statistics refreshed successfully!")
+
+if __name__ == "__main__":
+    run()
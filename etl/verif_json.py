@@ -1,10 +1,43 @@
 """
 @author: Joseph A.
-Description: This script checks if the JSON files have the required keys.
+Description: This script checks if the extracted files have the required keys.
+Newline-delimited JSON files (optionally .gz/.zst compressed) are validated record by record
+without being loaded in memory, legacy JSON arrays are still supported.
 """
 import os
+import glob
+import gzip
 import json
 
+def open_text(file_path):
+    """Open a file in text mode, decompressing it according to its extension"""
+    if file_path.endswith('.gz'):
+        return gzip.open(file_path, 'rt', encoding='utf-8')
+    if file_path.endswith('.zst'):
+        import zstandard # pylint: disable=C0415:import-outside-toplevel
+        return zstandard.open(file_path, 'rt', encoding='utf-8')
+    return open(file_path, 'r', encoding='utf-8')
+
+def check_ndjson_structure(file_path, required_keys):
+    """Check if every record of a NDJSON file has the required keys"""
+    count = 0
+    with open_text(file_path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if not isinstance(item, dict):
+                print(f"❌ Line {line_number} of {file_path} is not a JSON object")
+                return False
+            missing_keys = [key for key in required_keys if key not in item]
+            if missing_keys:
+                print(f"❌ Line {line_number} of {file_path} does not have the keys: {missing_keys}")
+                return False
+            count += 1
+
+    print(f"✅ The file {file_path} has the required keys ({count} records)")
+    return True
+
 def check_json_structure(file_path, required_keys):
     """Check if the JSON file has the required keys"""
     if not os.path.exists(file_path):
@@ -12,6 +45,9 @@ def check_json_structure(file_path, required_keys):
         return False
 
     try:
+        if '.ndjson' in os.path.basename(file_path):
+            return check_ndjson_structure(file_path, required_keys)
+
         with open(file_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
 
@@ -27,12 +63,20 @@ def check_json_structure(file_path, required_keys):
 
         print(f"✅ The file {file_path} has the required keys")
         return True
-    except (OSError, json.JSONDecodeError) as e:
+    except (OSError, EOFError, json.JSONDecodeError) as e:
         print(f"❌ Error while reading the file {file_path}: {str(e)}")
         return False
 
 required_keys_movies = ['id', 'title', 'release_date', 'vote_average', 'genre_ids']
 required_keys_series = ['id', 'name', 'first_air_date', 'vote_average', 'genre_ids']
 
-check_json_structure('./tmdb_data/netflix_movies.json', required_keys_movies)
-check_json_structure('./tmdb_data/netflix_series.json', required_keys_series)
+def extracted_files(pattern):
+    """List the extracted files matching a pattern, without the temporary files of an
+    extraction in progress or interrupted (e.g. netflix_movies.ndjson.tmp.gz)"""
+    return sorted(file_path for file_path in glob.glob(pattern)
+                if '.tmp' not in os.path.basename(file_path))
+
+for movies_file in extracted_files('./tmdb_data/netflix_movies*.*json*'):
+    check_json_structure(movies_file, required_keys_movies)
+for series_file in extracted_files('./tmdb_data/netflix_series*.*json*'):
+    check_json_structure(series_file, required_keys_series)
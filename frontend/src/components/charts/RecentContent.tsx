@@ -26,29 +26,22 @@ const RecentContent = ({ endpoint }: RecentContentProps) => {
   const getData = async () => {
     setIsLoading(true);
     try {
-      const response = await fetch(`${API_ENDPOINTS}/${endpoint}`);
+      // The API sorts by release date, only the five most recent titles are fetched
+      const response = await fetch(
+        `${API_ENDPOINTS}/${endpoint}?sort=recent&limit=5`
+      );
       if (!response.ok) throw new Error("Failed to get data");
 
       const data = await response.json();
 
       // Transform the data to match our interface
-      const validatedData = data
-        .map((item: RawContentItem) => ({
-          ...item,
-          genre:
-            typeof item.genre === "string"
-              ? item.genre.split(",").map((g) => g.trim())
-              : [],
-        }))
-        .sort((a: StreamlyticsContent, b: StreamlyticsContent) => {
-          const dateA = new Date(
-            a.release_date || a.first_air_date || ""
-          ).getTime();
-          const dateB = new Date(
-            b.release_date || b.first_air_date || ""
-          ).getTime();
-          return dateB - dateA;
-        });
+      const validatedData = data.map((item: RawContentItem) => ({
+        ...item,
+        genre:
+          typeof item.genre === "string"
+            ? item.genre.split(",").map((g) => g.trim())
+            : [],
+      }));
 
       setNetflixData(validatedData);
     } catch (error) {
@@ -1,70 +1,68 @@
 import { API_ENDPOINTS } from "@/config/api";
-import { APIDistributionResponse, APIRatingResponse } from "@/types/api";
+import {
+  APIDistributionResponse,
+  APIRatingResponse,
+  APIStatsBundle,
+} from "@/types/api";
+
+// Every dashboard statistic in a single request, shared by all the charts
+let statsBundle: Promise<APIStatsBundle> | null = null;
+
+export function fetchStatsBundle(): Promise<APIStatsBundle> {
+  if (!statsBundle) {
+    statsBundle = fetch(`${API_ENDPOINTS}/stats/bundle`)
+      .then((response) => {
+        if (!response.ok) throw new Error("Failed to get statistics");
+        return response.json();
+      })
+      .catch((error) => {
+        statsBundle = null; // Retry on the next call
+        throw error;
+      });
+  }
+  return statsBundle;
+}
 
 // Genre Distribution
 export async function fetchMovieGenreDistribution(): Promise<APIDistributionResponse> {
-  const response = await fetch(
-    `${API_ENDPOINTS}/stats/distribution/movies/genres`
-  );
-  const data = await response.json();
-  return data;
+  const data = await fetchStatsBundle();
+  return data.movies.genre_distribution;
 }
 
 export async function fetchSerieGenreDistribution(): Promise<APIDistributionResponse> {
-  const response = await fetch(
-    `${API_ENDPOINTS}/stats/distribution/series/genres`
-  );
-  const data = await response.json();
-  return data;
+  const data = await fetchStatsBundle();
+  return data.series.genre_distribution;
 }
 
 // Country Distribution
 export async function fetchMovieCountryDistribution(): Promise<APIDistributionResponse> {
-  const response = await fetch(
-    `${API_ENDPOINTS}/stats/distribution/movies/countries`
-  );
-  const data = await response.json();
-  return data;
+  const data = await fetchStatsBundle();
+  return data.movies.country_distribution;
 }
 
 export async function fetchSerieCountryDistribution(): Promise<APIDistributionResponse> {
-  const response = await fetch(
-    `${API_ENDPOINTS}/stats/distribution/series/countries`
-  );
-  const data = await response.json();
-  return data;
+  const data = await fetchStatsBundle();
+  return data.series.country_distribution;
 }
 
 // Years Trends
 export async function fetchMovieYearlyTrends(): Promise<APIDistributionResponse> {
-  const response = await fetch(
-    `${API_ENDPOINTS}/stats/distribution/movies/yearly`
-  );
-  const data = await response.json();
-  return data;
+  const data = await fetchStatsBundle();
+  return data.movies.yearly_distribution;
 }
 
 export async function fetchSerieYearlyTrends(): Promise<APIDistributionResponse> {
-  const response = await fetch(
-    `${API_ENDPOINTS}/stats/distribution/series/yearly`
-  );
-  const data = await response.json();
-  return data;
+  const data = await fetchStatsBundle();
+  return data.series.yearly_distribution;
 }
 
 // Ratings
 export async function fetchMovieRatings(): Promise<APIRatingResponse> {
-  const response = await fetch(
-    `${API_ENDPOINTS}/stats/ratings/movies/countries`
-  );
-  const data = await response.json();
-  return data;
+  const data = await fetchStatsBundle();
+  return data.movies.country_avg_ratings;
 }
 
 export async function fetchSerieRatings(): Promise<APIRatingResponse> {
-  const response = await fetch(
-    `${API_ENDPOINTS}/stats/ratings/series/countries`
-  );
-  const data = await response.json();
-  return data;
+  const data = await fetchStatsBundle();
+  return data.series.country_avg_ratings;
 }
@@ -25,3 +25,16 @@ export interface APIRatingResponse {
   total_ratings: number;
   average_rating: number;
 }
+
+interface MediaStats {
+  country_distribution: APIDistributionResponse;
+  genre_distribution: APIDistributionResponse;
+  yearly_distribution: APIDistributionResponse;
+  country_avg_ratings: APIRatingResponse;
+  genre_avg_ratings: APIRatingResponse;
+}
+
+export interface APIStatsBundle {
+  movies: MediaStats;
+  series: MediaStats;
+}